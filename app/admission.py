@@ -0,0 +1,155 @@
+import time
+import threading
+from collections import deque
+from functools import wraps
+
+from flask import current_app, jsonify
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted within the queue limits."""
+
+    def __init__(self, operation, retry_after):
+        super().__init__(f"Too many {operation} requests in progress")
+        self.operation = operation
+        self.retry_after = retry_after
+
+
+class WeightedSemaphore:
+    """A semaphore where each holder takes a weight out of a shared budget.
+
+    Waiting requests are admitted in arrival order: a new request never skips
+    the queue, even if it would fit, so large requests are not starved.
+    """
+
+    def __init__(self, budget, max_queue):
+        self.budget = budget
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.running = 0
+        self.waiters = deque()
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.condition = threading.Condition()
+
+    @property
+    def queued(self):
+        return len(self.waiters)
+
+    def acquire(self, weight, timeout):
+        """Take weight from the budget, waiting up to timeout seconds. Returns False if it was not admitted."""
+        # A single request bigger than the whole budget may still run, but only on its own
+        weight = min(weight, self.budget)
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            if self.waiters or self.in_use + weight > self.budget:
+                if len(self.waiters) >= self.max_queue:
+                    self.rejected_total += 1
+                    return False
+
+                ticket = object()
+                self.waiters.append(ticket)
+                try:
+                    while self.waiters[0] is not ticket or self.in_use + weight > self.budget:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected_total += 1
+                            return False
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiters.remove(ticket)
+                    # The next waiter may now be at the head of the queue, or fit in the budget
+                    self.condition.notify_all()
+
+            self.in_use += weight
+            self.running += 1
+            self.admitted_total += 1
+            return weight
+
+    def release(self, weight):
+        with self.condition:
+            self.in_use -= weight
+            self.running -= 1
+            self.condition.notify_all()
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                "budget": self.budget,
+                "in_use": self.in_use,
+                "running": self.running,
+                "queued": self.queued,
+                "admitted_total": self.admitted_total,
+                "rejected_total": self.rejected_total,
+            }
+
+
+class AdmissionController:
+    """Limit concurrent heavy operations with one weighted semaphore per operation type.
+
+    The weight of a request approximates the memory it needs (in MB) from the
+    size of its input, its page count and its image count. Limits apply per
+    worker process.
+    """
+
+    def __init__(self, budgets, max_queue=20, queue_timeout=10, retry_after=5,
+                 mb_per_page=0.5, mb_per_image=4):
+        self.semaphores = {operation: WeightedSemaphore(budget, max_queue) for operation, budget in budgets.items()}
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.mb_per_page = mb_per_page
+        self.mb_per_image = mb_per_image
+
+    def estimate(self, size_bytes=0, pages=0, images=0):
+        """Estimate the weight of a request from its input size, page count and image count."""
+        return max(1, size_bytes / (1024 * 1024) + pages * self.mb_per_page + images * self.mb_per_image)
+
+    def acquire(self, operation, weight):
+        """Admit a request or raise Overloaded. Returns the weight to pass to release()."""
+        admitted = self.semaphores[operation].acquire(weight, self.queue_timeout)
+        if not admitted:
+            raise Overloaded(operation, self.retry_after)
+        return admitted
+
+    def release(self, operation, weight):
+        self.semaphores[operation].release(weight)
+
+    def snapshot(self):
+        """Return the queue depth and budget usage of every operation type."""
+        return {operation: semaphore.snapshot() for operation, semaphore in self.semaphores.items()}
+
+
+class TooLarge(Exception):
+    """Raised by cost estimators when an input is over the configured limits."""
+
+
+def admission_controlled(operation, estimate_cost):
+    """Decorate a view so it only runs once the app's admission controller admits it.
+
+    The controller is read from current_app.extensions['admission']. estimate_cost()
+    is called in the request context and returns the keyword arguments of
+    AdmissionController.estimate(); it may raise TooLarge.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = current_app.extensions['admission']
+            try:
+                weight = controller.estimate(**estimate_cost())
+            except TooLarge as e:
+                return jsonify({"error": str(e)}), 413
+
+            try:
+                admitted = controller.acquire(operation, weight)
+            except Overloaded as e:
+                response = jsonify({"error": str(e) + ", please retry later"})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(operation, admitted)
+        return wrapper
+    return decorator
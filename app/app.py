@@ -1,259 +1,324 @@
-from flask import Flask, request, render_template, send_file, redirect, url_for, session, jsonify
-import PyPDF2
-import fitz  # PyMuPDF for secure redaction
+from flask import Flask, Blueprint, current_app, g, request, render_template, send_file, jsonify
 import os
+import gc
+import threading
 from werkzeug.utils import secure_filename
 import json
-from PIL import Image
-import img2pdf
-import zipfile
-import io
-
-app = Flask(__name__)
-    
-# Load secret key from environment variable
-app.secret_key = os.environ.get('SECRET_KEY', 'default_secret_key')
-
-app.config['UPLOAD_FOLDER'] = 'database/uploads/'
-app.config['MERGED_FOLDER'] = 'database/merged/'
-app.config['SPLIT_FOLDER'] = 'database/split/'
-app.config['CENSORED_FOLDER'] = 'database/censored/'
-app.config['CONVERTED_FOLDER'] = 'database/converted/'
-app.config['COUNTER_FILE'] = 'database/merge_counter.txt'
-
-# Ensure upload, merged, split, and censored directories exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['MERGED_FOLDER'], exist_ok=True)
-os.makedirs(app.config['SPLIT_FOLDER'], exist_ok=True)
-os.makedirs(app.config['CONVERTED_FOLDER'], exist_ok=True)
-os.makedirs(app.config['CENSORED_FOLDER'], exist_ok=True)
+from storage import create_storage
+from admission import AdmissionController, TooLarge, admission_controlled
 
-# Initialize or load the merge counter
-def initialize_counter():
-    """Initialize the counter from the file, create if it doesn't exist."""
-    if not os.path.exists(app.config['COUNTER_FILE']):
-        with open(app.config['COUNTER_FILE'], 'w') as f:
-            f.write('0')
-    with open(app.config['COUNTER_FILE'], 'r') as f:
-        return int(f.read().strip())
+# The PDF and image libraries (PyPDF2, fitz, PIL, img2pdf) are imported inside the views that
+# use them, so a worker that only serves pages starts without loading them.
+# See preload_operations() to load them once in a preforking master instead.
 
-# Update the merge counter
-def update_counter():
-    """Increment the counter and save it to the file, returning the new value."""
-    count = initialize_counter() + 1
-    with open(app.config['COUNTER_FILE'], 'w') as f:
-        f.write(str(count))
-    return count
-
-def merge_pdfs(pdf_list, output_path):
-    """Merge a list of PDFs into one PDF and save it to the specified path."""
-    pdf_merger = PyPDF2.PdfMerger()
-    
-    for pdf in pdf_list:
-        pdf_merger.append(pdf)
-    
-    with open(output_path, 'wb') as output_pdf:
-        pdf_merger.write(output_pdf)
-
-def get_pdf_page_count(pdf_path):
-    """Get the number of pages in a PDF."""
-    with open(pdf_path, 'rb') as f:
-        pdf_reader = PyPDF2.PdfReader(f)
-        return len(pdf_reader.pages)
-
-def split_pdf_all_pages(pdf_path, output_folder, base_name):
-    """Split PDF into individual pages."""
-    output_files = []
-    with open(pdf_path, 'rb') as f:
-        pdf_reader = PyPDF2.PdfReader(f)
-        total_pages = len(pdf_reader.pages)
-        
-        for page_num in range(total_pages):
-            pdf_writer = PyPDF2.PdfWriter()
-            pdf_writer.add_page(pdf_reader.pages[page_num])
-            
-            output_filename = f"{base_name}_page_{page_num + 1}.pdf"
-            output_path = os.path.join(output_folder, output_filename)
-            
-            with open(output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-            
-            output_files.append(output_filename)
+bp = Blueprint('pdf_manipulator', __name__)
+
+# Guards the lazy creation of the storage backend when a worker serves requests in threads
+storage_lock = threading.Lock()
+
+def load_config(app):
+    """Fill the app configuration from the environment."""
+    # Load secret key from environment variable
+    app.secret_key = os.environ.get('SECRET_KEY', 'default_secret_key')
+    
+    app.config['UPLOAD_FOLDER'] = 'database/uploads/'
+    app.config['MERGED_FOLDER'] = 'database/merged/'
+    app.config['SPLIT_FOLDER'] = 'database/split/'
+    app.config['CENSORED_FOLDER'] = 'database/censored/'
+    app.config['CONVERTED_FOLDER'] = 'database/converted/'
+    app.config['OCR_CACHE_FOLDER'] = 'database/ocr_cache/'
+    app.config['COUNTER_FILE'] = 'database/merge_counter.txt'
     
-    return output_files
+    # Storage backend: 'local' (folders above) or 's3' (shared bucket, for running several nodes)
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local')
+    app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET', '')
+    app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL', '')  # e.g. http://localhost:9000 for MinIO
+    app.config['S3_REGION'] = os.environ.get('S3_REGION', '')
+    app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+    app.config['STORAGE_SCRATCH_FOLDER'] = os.environ.get('STORAGE_SCRATCH_FOLDER', '')
+    
+    # Limits on incoming work (Flask answers 413 on its own above MAX_CONTENT_LENGTH)
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', '200')) * 1024 * 1024
+    app.config['MAX_PAGES'] = int(os.environ.get('MAX_PAGES', '2000'))
+    # Approximate memory budget (MB) per operation type and per worker process
+    app.config['ADMISSION_BUDGETS'] = {
+        'convert': int(os.environ.get('ADMISSION_BUDGET_CONVERT', '512')),
+        'merge': int(os.environ.get('ADMISSION_BUDGET_MERGE', '512')),
+        'split': int(os.environ.get('ADMISSION_BUDGET_SPLIT', '512')),
+        'censor': int(os.environ.get('ADMISSION_BUDGET_CENSOR', '1024')),
+        'ocr': int(os.environ.get('ADMISSION_BUDGET_OCR', '1024')),
+    }
+    app.config['ADMISSION_BUDGETS']['pipeline'] = int(os.environ.get('ADMISSION_BUDGET_PIPELINE', '1024'))
+    app.config['ADMISSION_MAX_QUEUE'] = int(os.environ.get('ADMISSION_MAX_QUEUE', '20'))
+    app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))
+    app.config['ADMISSION_RETRY_AFTER'] = int(os.environ.get('ADMISSION_RETRY_AFTER', '5'))
+    app.config['CENSOR_SAVE_PROFILE'] = os.environ.get('CENSOR_SAVE_PROFILE', 'forensic')
+    app.config['OCR_LANGUAGE'] = os.environ.get('OCR_LANGUAGE', 'eng')
+    app.config['OCR_DPI'] = int(os.environ.get('OCR_DPI', '300'))
+    app.config['OCR_WORKERS'] = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+    
+    # Import the operation libraries at startup (for preforking servers, see preload_operations)
+    app.config['PRELOAD_OPERATIONS'] = os.environ.get('PRELOAD_OPERATIONS', '0') == '1'
 
-def split_pdf_custom_pages(pdf_path, output_folder, base_name, page_ranges):
-    """Split PDF by custom page ranges."""
-    output_files = []
-    with open(pdf_path, 'rb') as f:
-        pdf_reader = PyPDF2.PdfReader(f)
-        total_pages = len(pdf_reader.pages)
-        
-        for idx, page_range in enumerate(page_ranges):
-            pdf_writer = PyPDF2.PdfWriter()
-            
-            # Parse page range
-            if '-' in page_range:
-                start, end = map(int, page_range.split('-'))
-                pages = range(start - 1, min(end, total_pages))
-            else:
-                page_num = int(page_range) - 1
-                if 0 <= page_num < total_pages:
-                    pages = [page_num]
-                else:
-                    continue
-            
-            for page_num in pages:
-                if 0 <= page_num < total_pages:
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
-            
-            if len(pdf_writer.pages) > 0:
-                output_filename = f"{base_name}_part_{idx + 1}.pdf"
-                output_path = os.path.join(output_folder, output_filename)
-                
-                with open(output_path, 'wb') as output_file:
-                    pdf_writer.write(output_file)
-                
-                output_files.append(output_filename)
+def preload_operations():
+    """Import every operation module now, then freeze the heap.
+    
+    Call this in the master of a preforking server (e.g. gunicorn --preload) so the
+    workers share the imported code pages instead of each importing them again.
+    gc.freeze() keeps the garbage collector from touching, and so copying, those objects.
+    """
+    import pdf_tools  # noqa: F401
+    import censor_tools  # noqa: F401
+    import convert_tools  # noqa: F401
+    import pipeline  # noqa: F401
+    import zipfile  # noqa: F401
+    gc.freeze()
+
+def create_app(config=None):
+    """Create the Flask application. No folder is created and no PDF library is imported here."""
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
     
-    return output_files
+    # Admission control for the heavy operations
+    app.extensions['admission'] = AdmissionController(
+        app.config['ADMISSION_BUDGETS'],
+        max_queue=app.config['ADMISSION_MAX_QUEUE'],
+        queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT'],
+        retry_after=app.config['ADMISSION_RETRY_AFTER']
+    )
+    app.register_blueprint(bp)
+    
+    if app.config['PRELOAD_OPERATIONS']:
+        preload_operations()
+    
+    return app
+
+def get_storage():
+    """Return the storage backend, creating it (and the local folders) on first use."""
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        with storage_lock:
+            storage = current_app.extensions.get('storage')
+            if storage is None:
+                storage = create_storage(current_app.config)
+                # The OCR cache is a per-node cache, it is always kept on local disk
+                os.makedirs(current_app.config['OCR_CACHE_FOLDER'], exist_ok=True)
+                current_app.extensions['storage'] = storage
+    return storage
+
+def upload_cost():
+    """Estimate the cost of a multipart upload request; every uploaded file counts as one image."""
+    return {
+        "size_bytes": request.content_length or 0,
+        "images": len(request.files.getlist('files'))
+    }
+
+def pipeline_cost():
+    """Estimate the cost of a pipeline request; each step may keep a copy of the input in memory."""
+    cost = upload_cost()
+    try:
+        steps = len(json.loads(request.form.get('pipeline', '{}')).get('steps', []))
+    except (ValueError, AttributeError):
+        steps = 0  # The view answers with its own error
+    cost["size_bytes"] *= 1 + steps
+    return cost
+
+def fetch_upload(filename):
+    """Return the local path of an uploaded file, reusing the copy fetched by stored_pdf_cost()."""
+    fetched = g.get('fetched_upload')
+    if fetched and fetched[0] == filename:
+        return fetched[1]
+    return get_storage().fetch('uploads', filename)
+
+def stored_pdf_cost():
+    """Estimate the cost of a request working on an uploaded PDF named in its JSON body.
+    
+    Only the file size and the page count are read, so the estimate stays cheap. With
+    remote storage nothing is downloaded before admission: the request is sized from the
+    object metadata, and the page count was already checked when the file was uploaded.
+    """
+    import fitz
+    
+    data = request.get_json(silent=True)
+    filename = data.get('filename') if isinstance(data, dict) else None
+    if not filename or not isinstance(filename, str):
+        return {}  # The view answers with its own error
+    
+    storage = get_storage()
+    if storage.remote:
+        size = storage.size('uploads', filename)
+        return {"size_bytes": size} if size is not None else {}
+    
+    file_path = storage.fetch('uploads', filename)
+    if not file_path:
+        return {}
+    g.fetched_upload = (filename, file_path)
+    
+    try:
+        doc = fitz.open(file_path)
+    except Exception:
+        return {}  # Not a readable PDF, the view answers with its own error
+    try:
+        pages = len(doc)
+    finally:
+        doc.close()
+    
+    limit_error = check_page_limit(pages)
+    if limit_error:
+        raise TooLarge(limit_error)
+    
+    return {"size_bytes": os.path.getsize(file_path), "pages": pages}
 
-def split_pdf_by_interval(pdf_path, output_folder, base_name, interval):
-    """Split PDF by page interval."""
-    output_files = []
-    with open(pdf_path, 'rb') as f:
-        pdf_reader = PyPDF2.PdfReader(f)
-        total_pages = len(pdf_reader.pages)
-        
-        part = 1
-        for start_page in range(0, total_pages, interval):
-            pdf_writer = PyPDF2.PdfWriter()
-            end_page = min(start_page + interval, total_pages)
-            
-            for page_num in range(start_page, end_page):
-                pdf_writer.add_page(pdf_reader.pages[page_num])
-            
-            output_filename = f"{base_name}_part_{part}.pdf"
-            output_path = os.path.join(output_folder, output_filename)
-            
-            with open(output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-            
-            output_files.append(output_filename)
-            part += 1
+def ocr_cost():
+    """Estimate the cost of an OCR request: the PDF, plus the pages rendered at OCR_DPI it keeps in flight.
     
-    return output_files
+    At most ocr_window() rendered pages are held at once, each counted as an uncompressed
+    RGB Letter-size pixmap, an upper bound of the PNG sent to the OCR pool.
+    """
+    from censor_tools import ocr_window
+    
+    cost = stored_pdf_cost()
+    if not cost:
+        return cost
+    
+    dpi = current_app.config['OCR_DPI']
+    page_bytes = int(8.5 * dpi) * int(11 * dpi) * 3
+    in_flight = ocr_window(current_app.config['OCR_WORKERS'])
+    if cost.get('pages'):
+        in_flight = min(in_flight, cost['pages'])
+    # One more page for the pixmap being rendered
+    cost["size_bytes"] += (in_flight + 1) * page_bytes
+    return cost
+
+def check_page_limit(page_count):
+    """Return an error message if a PDF has more pages than allowed, otherwise None."""
+    if page_count > current_app.config['MAX_PAGES']:
+        return f"PDF has {page_count} pages, the maximum is {current_app.config['MAX_PAGES']}"
+    return None
+
+def send_stored_file(area, name, file_path):
+    """Send a stored file as a download and drop this node's working copy once the response is closed."""
+    storage = get_storage()
+    response = send_file(file_path, as_attachment=True, download_name=name)
+    response.call_on_close(lambda: storage.release(area, name))
+    return response
+
+# Initialize or load the merge counter
+def initialize_counter():
+    """Initialize the counter from the storage backend, create if it doesn't exist."""
+    return get_storage().read_counter()
 
-@app.route('/')
+# Update the merge counter
+def update_counter():
+    """Increment the counter in the storage backend, returning the new value."""
+    return get_storage().increment_counter()
+
+@bp.route('/')
 def index():
     """Render the home page with clean navigation."""
     return render_template('home.html')
 
-@app.route('/merge')
+@bp.route('/merge')
 def merge_page():
     """Render the merge PDF page."""
     return render_template('merge.html')
 
-@app.route('/split')
+@bp.route('/split')
 def split_page():
     """Render the split PDF page."""
     return render_template('split.html')
 
-@app.route('/convert')
+@bp.route('/convert')
 def convert_page():
     """Render the convert images to PDF page."""
     return render_template('convert.html')
 
-@app.route('/censor')
+@bp.route('/censor')
 def censor_page():
-    """Render the censor PDF page."""
-    return render_template('censor.html')
+    """Render the censor PDF page, with the configured save profile selected by default."""
+    return render_template('censor.html', save_profile=current_app.config['CENSOR_SAVE_PROFILE'])
 
-@app.route('/extract')
+@bp.route('/extract')
 def extract_page():
     """Render the extract pages page."""
     return render_template('index.html')  # TODO: Create dedicated page
 
-@app.route('/remove')
+@bp.route('/remove')
 def remove_page():
     """Render the remove pages page."""
     return render_template('index.html')  # TODO: Create dedicated page
 
-@app.route('/rotate')
+@bp.route('/rotate')
 def rotate_page():
     """Render the rotate PDF page."""
     return render_template('index.html')  # TODO: Create dedicated page
 
-@app.route('/protect')
+@bp.route('/protect')
 def protect_page():
     """Render the protect PDF page."""
     return render_template('index.html')  # TODO: Create dedicated page
 
-@app.route('/unlock')
+@bp.route('/unlock')
 def unlock_page():
     """Render the unlock PDF page."""
     return render_template('index.html')  # TODO: Create dedicated page
 
-@app.route('/convert/execute', methods=['POST'])
+@bp.route('/convert/execute', methods=['POST'])
+@admission_controlled('convert', upload_cost)
 def convert_images_to_pdf():
     """Convert uploaded images to separate PDF files."""
+    from convert_tools import convert_image_to_pdf
+    import zipfile
+    import io
+    
     image_paths = []
     pdf_files = []
     
+    # Read outside the try so an upload over MAX_CONTENT_LENGTH is answered with 413
+    uploaded_files = request.files.getlist('files')
+    
     try:
-        uploaded_files = request.files.getlist('files')
         if not uploaded_files:
             return "No files uploaded", 400
         
-        # Save uploaded images
+        # Every image becomes one PDF page
+        limit_error = check_page_limit(len(uploaded_files))
+        if limit_error:
+            return limit_error, 413
+        
+        # Save uploaded images and convert each one to a separate PDF
         for file in uploaded_files:
             if file and file.filename:
                 filename = secure_filename(file.filename)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                file_path = get_storage().path('uploads', filename)
                 file.save(file_path)
+                image_paths.append(file_path)
+                
+                # Generate output filename (replace image extension with .pdf)
+                base_name = os.path.splitext(filename)[0]
+                pdf_filename = f"{base_name}.pdf"
+                pdf_path = get_storage().path('converted', pdf_filename)
                 
-                # Verify it's an image
                 try:
-                    with Image.open(file_path) as img:
-                        # Convert to RGB if necessary (for PNG with transparency, etc.)
-                        if img.mode not in ('RGB', 'L'):
-                            img = img.convert('RGB')
-                            # Save as temporary file if conversion was needed
-                            temp_path = file_path + '_temp.jpg'
-                            img.save(temp_path, 'JPEG')
-                            image_paths.append((temp_path, filename))
-                            os.remove(file_path)
-                        else:
-                            image_paths.append((file_path, filename))
-                except Exception as e:
-                    # Clean up on error
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                    convert_image_to_pdf(file_path, pdf_path)
+                except Exception:
+                    # Not a valid image, skip it
                     continue
-        
-        if not image_paths:
-            return "No valid image files uploaded", 400
-        
-        # Convert each image to a separate PDF
-        for image_path, original_filename in image_paths:
-            # Generate output filename (replace image extension with .pdf)
-            base_name = os.path.splitext(original_filename)[0]
-            pdf_filename = f"{base_name}.pdf"
-            pdf_path = os.path.join(app.config['CONVERTED_FOLDER'], pdf_filename)
-            
-            # Convert single image to PDF
-            with open(pdf_path, 'wb') as f:
-                f.write(img2pdf.convert([image_path]))
-            
-            pdf_files.append((pdf_path, pdf_filename))
+                
+                pdf_files.append((pdf_path, pdf_filename))
         
         # Clean up uploaded images
-        for image_path, _ in image_paths:
+        for image_path in image_paths:
             try:
                 os.remove(image_path)
             except:
                 pass
         
+        if not pdf_files:
+            return "No valid image files uploaded", 400
+        
         # If only one image, return single PDF
         if len(pdf_files) == 1:
             pdf_path, pdf_filename = pdf_files[0]
@@ -282,7 +347,7 @@ def convert_images_to_pdf():
     
     except Exception as e:
         # Clean up on error
-        for image_path, _ in image_paths:
+        for image_path in image_paths:
             try:
                 os.remove(image_path)
             except:
@@ -294,9 +359,12 @@ def convert_images_to_pdf():
                 pass
         return f"Error converting images: {str(e)}", 500
 
-@app.route('/upload', methods=['POST'])
+@bp.route('/upload', methods=['POST'])
+@admission_controlled('merge', upload_cost)
 def upload_files():
     """Handle the file upload and merge PDFs directly, returning the merged file."""
+    from pdf_tools import merge_pdfs, get_pdf_page_count
+    
     uploaded_files = request.files.getlist('files')
     if not uploaded_files:
         return "No files uploaded", 400
@@ -310,20 +378,32 @@ def upload_files():
         for file in uploaded_files:
             if file and file.filename.endswith('.pdf'):
                 filename = secure_filename(file.filename)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                file_path = get_storage().path('uploads', filename)
                 file.save(file_path)
                 file_paths.append(file_path)
         
         if len(file_paths) < 2:
             return "At least 2 valid PDF files are required", 400
         
+        # The merged output has as many pages as all the inputs together
+        total_pages = sum(get_pdf_page_count(file_path) for file_path in file_paths)
+        limit_error = check_page_limit(total_pages)
+        if limit_error:
+            for file_path in file_paths:
+                try:
+                    os.remove(file_path)
+                except:
+                    pass
+            return limit_error, 413
+        
         # Update the merge counter and create the new filename
         merge_count = update_counter()
         merged_filename = f'merged_output_{merge_count}.pdf'
-        merged_file_path = os.path.join(app.config['MERGED_FOLDER'], merged_filename)
+        merged_file_path = get_storage().path('merged', merged_filename)
         
         # Merge PDFs in the order they were uploaded
         merge_pdfs(file_paths, merged_file_path)
+        get_storage().commit('merged', merged_filename)
         
         # Clean up uploaded files
         for file_path in file_paths:
@@ -333,7 +413,7 @@ def upload_files():
                 pass
         
         # Return the merged file directly
-        return send_file(merged_file_path, as_attachment=True, download_name=merged_filename)
+        return send_stored_file('merged', merged_filename, merged_file_path)
     
     except Exception as e:
         # Clean up on error
@@ -344,30 +424,40 @@ def upload_files():
                 pass
         return f"Error merging PDFs: {str(e)}", 500
 
-@app.route('/download/<filename>', methods=['GET'])
+@bp.route('/download/<filename>', methods=['GET'])
 def download_file(filename):
     """Serve the merged PDF file for download."""
-    merged_file_path = os.path.join(app.config['MERGED_FOLDER'], filename)
-    if not os.path.exists(merged_file_path):
+    merged_file_path = get_storage().fetch('merged', filename)
+    if not merged_file_path:
         return "File not found", 404
 
-    return send_file(merged_file_path, as_attachment=True, download_name=filename)
+    return send_stored_file('merged', filename, merged_file_path)
 
-@app.route('/split/info', methods=['POST'])
+@bp.route('/split/info', methods=['POST'])
 def split_info():
     """Get information about the uploaded PDF for splitting."""
+    from pdf_tools import get_pdf_page_count
+    
+    # Read outside the try so an upload over MAX_CONTENT_LENGTH is answered with 413
+    uploaded_file = request.files.get('file')
+    
     try:
-        uploaded_file = request.files.get('file')
         if not uploaded_file or not uploaded_file.filename.endswith('.pdf'):
             return {"error": "Please upload a valid PDF file"}, 400
         
         # Save temporarily to get page count
         filename = secure_filename(uploaded_file.filename)
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        temp_path = get_storage().path('uploads', filename)
         uploaded_file.save(temp_path)
+        get_storage().commit('uploads', filename)
         
         page_count = get_pdf_page_count(temp_path)
         
+        limit_error = check_page_limit(page_count)
+        if limit_error:
+            get_storage().delete('uploads', filename)
+            return {"error": limit_error}, 413
+        
         return {
             "filename": filename,
             "pages": page_count,
@@ -376,9 +466,12 @@ def split_info():
     except Exception as e:
         return {"error": str(e)}, 500
 
-@app.route('/split/execute', methods=['POST'])
+@bp.route('/split/execute', methods=['POST'])
+@admission_controlled('split', stored_pdf_cost)
 def split_pdf():
     """Execute PDF splitting based on the selected mode."""
+    from pdf_tools import split_pdf_all_pages, split_pdf_custom_pages, split_pdf_by_interval
+    
     try:
         data = request.get_json()
         filename = data.get('filename')
@@ -387,15 +480,16 @@ def split_pdf():
         if not filename:
             return {"error": "No file specified"}, 400
         
-        pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if not os.path.exists(pdf_path):
+        pdf_path = fetch_upload(filename)
+        if not pdf_path:
             return {"error": "File not found"}, 404
         
         base_name = os.path.splitext(filename)[0]
+        split_folder = get_storage().folder('split')
         output_files = []
         
         if mode == 'all':
-            output_files = split_pdf_all_pages(pdf_path, app.config['SPLIT_FOLDER'], base_name)
+            output_files = split_pdf_all_pages(pdf_path, split_folder, base_name)
         
         elif mode == 'custom':
             pages_input = data.get('pages', '')
@@ -404,23 +498,24 @@ def split_pdf():
             
             # Parse pages input (e.g., "1, 3-5, 7")
             page_ranges = [p.strip() for p in pages_input.split(',')]
-            output_files = split_pdf_custom_pages(pdf_path, app.config['SPLIT_FOLDER'], base_name, page_ranges)
+            output_files = split_pdf_custom_pages(pdf_path, split_folder, base_name, page_ranges)
         
         elif mode == 'interval':
             interval = data.get('interval')
             if not interval or interval < 1:
                 return {"error": "Please specify a valid interval"}, 400
             
-            output_files = split_pdf_by_interval(pdf_path, app.config['SPLIT_FOLDER'], base_name, interval)
+            output_files = split_pdf_by_interval(pdf_path, split_folder, base_name, interval)
         
         else:
             return {"error": "Invalid split mode"}, 400
         
+        for output_file in output_files:
+            get_storage().commit('split', output_file)
+            get_storage().release('split', output_file)
+        
         # Clean up uploaded file
-        try:
-            os.remove(pdf_path)
-        except:
-            pass
+        get_storage().delete('uploads', filename)
         
         if not output_files:
             return {"error": "No files were generated"}, 400
@@ -434,16 +529,16 @@ def split_pdf():
     except Exception as e:
         return {"error": str(e)}, 500
 
-@app.route('/split/download/<filename>', methods=['GET'])
+@bp.route('/split/download/<filename>', methods=['GET'])
 def download_split_file(filename):
     """Download a split PDF file."""
-    split_file_path = os.path.join(app.config['SPLIT_FOLDER'], filename)
-    if not os.path.exists(split_file_path):
+    split_file_path = get_storage().fetch('split', filename)
+    if not split_file_path:
         return "File not found", 404
     
-    return send_file(split_file_path, as_attachment=True, download_name=filename)
+    return send_stored_file('split', filename, split_file_path)
 
-@app.route('/split/download_all', methods=['POST'])
+@bp.route('/split/download_all', methods=['POST'])
 def download_all_split_files():
     """Create a zip file with all split PDFs and download it."""
     import zipfile
@@ -460,9 +555,10 @@ def download_all_split_files():
         memory_file = BytesIO()
         with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
             for filename in filenames:
-                file_path = os.path.join(app.config['SPLIT_FOLDER'], filename)
-                if os.path.exists(file_path):
+                file_path = get_storage().fetch('split', filename)
+                if file_path:
                     zf.write(file_path, filename)
+                    get_storage().release('split', filename)
         
         memory_file.seek(0)
         
@@ -479,21 +575,35 @@ def download_all_split_files():
 
 # ==================== PDF CENSORING ROUTES ====================
 
-@app.route('/censor/upload', methods=['POST'])
+@bp.route('/censor/upload', methods=['POST'])
 def censor_upload():
     """Upload PDF for censoring and return page information."""
+    import fitz
+    from censor_tools import is_scanned_page
+    
+    # Read outside the try so an upload over MAX_CONTENT_LENGTH is answered with 413
+    uploaded_file = request.files.get('file')
+    
     try:
-        uploaded_file = request.files.get('file')
         if not uploaded_file or not uploaded_file.filename.endswith('.pdf'):
             return jsonify({"error": "Please upload a valid PDF file"}), 400
         
         filename = secure_filename(uploaded_file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        file_path = get_storage().path('uploads', filename)
         uploaded_file.save(file_path)
+        get_storage().commit('uploads', filename)
         
         # Get PDF information using PyMuPDF
         doc = fitz.open(file_path)
+        
+        limit_error = check_page_limit(len(doc))
+        if limit_error:
+            doc.close()
+            get_storage().delete('uploads', filename)
+            return jsonify({"error": limit_error}), 413
+        
         pages_info = []
+        scanned_pages = 0
         
         for page_num in range(len(doc)):
             page = doc[page_num]
@@ -502,6 +612,8 @@ def censor_upload():
                 "width": page.rect.width,
                 "height": page.rect.height
             })
+            if is_scanned_page(page):
+                scanned_pages += 1
         
         doc.close()
         
@@ -509,19 +621,22 @@ def censor_upload():
             "success": True,
             "filename": filename,
             "total_pages": len(pages_info),
-            "pages_info": pages_info
+            "pages_info": pages_info,
+            "scanned_pages": scanned_pages
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/censor/render_page/<filename>/<int:page_num>', methods=['GET'])
+@bp.route('/censor/render_page/<filename>/<int:page_num>', methods=['GET'])
 def censor_render_page(filename, page_num):
     """Render a specific page of the PDF as an image for preview."""
+    import fitz
+    
     try:
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if not os.path.exists(file_path):
+        file_path = get_storage().fetch('uploads', filename)
+        if not file_path:
             return jsonify({"error": "File not found"}), 404
         
         doc = fitz.open(file_path)
@@ -551,9 +666,48 @@ def censor_render_page(filename, page_num):
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/censor/search_text', methods=['POST'])
+@bp.route('/censor/ocr', methods=['POST'])
+@admission_controlled('ocr', ocr_cost)
+def censor_ocr():
+    """Run OCR on the scanned pages of an uploaded PDF so text search works on them."""
+    from censor_tools import ocr_pdf
+    
+    try:
+        data = request.get_json()
+        filename = data.get('filename')
+        
+        if not filename:
+            return jsonify({"error": "Filename required"}), 400
+        
+        file_path = fetch_upload(filename)
+        if not file_path:
+            return jsonify({"error": "File not found"}), 404
+        
+        ocr_pages, cached_pages = ocr_pdf(
+            file_path,
+            current_app.config['OCR_CACHE_FOLDER'],
+            language=current_app.config['OCR_LANGUAGE'],
+            dpi=current_app.config['OCR_DPI'],
+            workers=current_app.config['OCR_WORKERS']
+        )
+        if ocr_pages:
+            get_storage().commit('uploads', filename)
+        
+        return jsonify({
+            "success": True,
+            "ocr_pages": ocr_pages,
+            "cached_pages": cached_pages
+        })
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/censor/search_text', methods=['POST'])
 def censor_search_text():
     """Search for text in the PDF and return coordinates for automatic redaction."""
+    from censor_tools import search_text
+    
     try:
         data = request.get_json()
         filename = data.get('filename')
@@ -563,32 +717,11 @@ def censor_search_text():
         if not filename or not search_term:
             return jsonify({"error": "Filename and search term required"}), 400
         
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if not os.path.exists(file_path):
+        file_path = get_storage().fetch('uploads', filename)
+        if not file_path:
             return jsonify({"error": "File not found"}), 404
         
-        doc = fitz.open(file_path)
-        results = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Search for text
-            text_instances = page.search_for(
-                search_term,
-                quads=False  # Returns rectangles instead of quads
-            )
-            
-            for rect in text_instances:
-                results.append({
-                    "page": page_num + 1,
-                    "x": rect.x0,
-                    "y": rect.y0,
-                    "width": rect.x1 - rect.x0,
-                    "height": rect.y1 - rect.y0
-                })
-        
-        doc.close()
+        results = search_text(file_path, search_term)
         
         return jsonify({
             "success": True,
@@ -600,115 +733,83 @@ def censor_search_text():
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/censor/execute', methods=['POST'])
+@bp.route('/censor/execute', methods=['POST'])
+@admission_controlled('censor', stored_pdf_cost)
 def censor_execute():
     """Execute permanent redaction on the PDF with specified zones."""
+    from censor_tools import SAVE_PROFILES, LeakedTextError, redact_pdf
+    
     try:
         data = request.get_json()
         filename = data.get('filename')
         redaction_zones = data.get('redaction_zones', [])
         remove_metadata = data.get('remove_metadata', True)
         redaction_color = data.get('redaction_color', [0, 0, 0])  # RGB color for redaction
+        save_profile = data.get('save_profile', current_app.config['CENSOR_SAVE_PROFILE'])
         
         if not filename:
             return jsonify({"error": "Filename required"}), 400
         
+        if save_profile not in SAVE_PROFILES:
+            return jsonify({"error": f"Unknown save profile: {save_profile}"}), 400
+        
         if not redaction_zones or len(redaction_zones) == 0:
             return jsonify({"error": "No redaction zones specified"}), 400
         
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if not os.path.exists(file_path):
+        file_path = fetch_upload(filename)
+        if not file_path:
             return jsonify({"error": "File not found"}), 404
         
-        # Open PDF with PyMuPDF
-        doc = fitz.open(file_path)
-        
-        # Group redaction zones by page for efficient processing
-        zones_by_page = {}
-        for zone in redaction_zones:
-            page_num = zone.get('page', 1)
-            if page_num not in zones_by_page:
-                zones_by_page[page_num] = []
-            zones_by_page[page_num].append(zone)
-        
-        # Apply redactions to each page
-        for page_num, zones in zones_by_page.items():
-            if page_num < 1 or page_num > len(doc):
-                continue
-            
-            page = doc[page_num - 1]
-            
-            for zone in zones:
-                # Create rectangle for redaction
-                # Coordinates are in PDF space
-                x = zone.get('x', 0)
-                y = zone.get('y', 0)
-                width = zone.get('width', 0)
-                height = zone.get('height', 0)
-                
-                rect = fitz.Rect(x, y, x + width, y + height)
-                
-                # Add redaction annotation (marks area for permanent removal)
-                page.add_redact_annot(
-                    rect,
-                    fill=redaction_color  # Color of redaction box
-                )
-            
-            # Apply all redactions on this page (permanently removes content)
-            # Using simple apply_redactions() which removes all content by default
-            page.apply_redactions()
-        
-        # Remove metadata if requested
-        if remove_metadata:
-            # Clear all metadata
-            doc.set_metadata({})
-            
-            # Remove XMP metadata
-            doc.del_xml_metadata()
-        
         # Save censored PDF
         base_name = os.path.splitext(filename)[0]
         censored_filename = f"{base_name}_CENSORED.pdf"
-        censored_path = os.path.join(app.config['CENSORED_FOLDER'], censored_filename)
-        
-        # Save with garbage collection to remove deleted objects
-        doc.save(
-            censored_path,
-            garbage=4,  # Maximum garbage collection
-            deflate=True,  # Compress content streams
-            clean=True     # Clean and sanitize PDF
-        )
-        doc.close()
+        censored_path = get_storage().path('censored', censored_filename)
         
-        # Clean up original file
         try:
-            os.remove(file_path)
-        except:
-            pass
+            verified_words = redact_pdf(
+                file_path,
+                censored_path,
+                redaction_zones,
+                remove_metadata=remove_metadata,
+                redaction_color=redaction_color,
+                save_profile=save_profile
+            )
+        except LeakedTextError as e:
+            return jsonify({"error": str(e), "leaked": e.leaked}), 500
+        
+        get_storage().commit('censored', censored_filename)
+        get_storage().release('censored', censored_filename)
+        
+        # Clean up original file
+        get_storage().delete('uploads', filename)
         
         return jsonify({
             "success": True,
             "filename": censored_filename,
-            "redacted_areas": len(redaction_zones)
+            "redacted_areas": len(redaction_zones),
+            "save_profile": save_profile,
+            "verified_words": verified_words
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/censor/download/<filename>', methods=['GET'])
+@bp.route('/censor/download/<filename>', methods=['GET'])
 def censor_download(filename):
     """Download the censored PDF file."""
-    censored_path = os.path.join(app.config['CENSORED_FOLDER'], filename)
-    if not os.path.exists(censored_path):
+    censored_path = get_storage().fetch('censored', filename)
+    if not censored_path:
         return "File not found", 404
     
-    return send_file(censored_path, as_attachment=True, download_name=filename)
+    return send_stored_file('censored', filename, censored_path)
 
 
-@app.route('/censor/preview', methods=['POST'])
+@bp.route('/censor/preview', methods=['POST'])
 def censor_preview():
     """Generate a preview of the PDF with redaction boxes overlaid (non-permanent)."""
+    import fitz
+    
     try:
         data = request.get_json()
         filename = data.get('filename')
@@ -718,8 +819,8 @@ def censor_preview():
         if not filename:
             return jsonify({"error": "Filename required"}), 400
         
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if not os.path.exists(file_path):
+        file_path = get_storage().fetch('uploads', filename)
+        if not file_path:
             return jsonify({"error": "File not found"}), 404
         
         doc = fitz.open(file_path)
@@ -762,5 +863,91 @@ def censor_preview():
         return jsonify({"error": str(e)}), 500
 
 
+# ==================== PIPELINE ROUTE ====================
+
+@bp.route('/pipeline', methods=['POST'])
+@admission_controlled('pipeline', pipeline_cost)
+def run_pipeline():
+    """Run several operations on the uploaded files in one request and return only the final result."""
+    from pipeline import Pipeline, PipelineError, PipelineTooLarge
+    from censor_tools import SAVE_PROFILES, LeakedTextError
+    import zipfile
+    import io
+    
+    try:
+        spec = json.loads(request.form.get('pipeline', ''))
+    except ValueError:
+        return jsonify({"error": "The 'pipeline' field must be a JSON description of the steps"}), 400
+    
+    if not isinstance(spec, dict):
+        return jsonify({"error": "The 'pipeline' field must be a JSON object"}), 400
+    
+    save_profile = spec.get('save_profile', current_app.config['CENSOR_SAVE_PROFILE'])
+    if not isinstance(save_profile, str) or save_profile not in SAVE_PROFILES:
+        return jsonify({"error": f"Unknown save profile: {save_profile}"}), 400
+    
+    if not isinstance(spec.get('filename', ''), str):
+        return jsonify({"error": "The filename must be a string"}), 400
+    
+    # Uploaded files stay in memory, nothing is written to the upload folder
+    files = {}
+    for file in request.files.getlist('files'):
+        if file and file.filename:
+            files[file.filename] = file.read()
+    
+    pipeline = None
+    try:
+        pipeline = Pipeline(spec, files, max_pages=current_app.config['MAX_PAGES'])
+        docs = pipeline.run()
+        
+        if not docs:
+            return jsonify({"error": "The pipeline produced no document"}), 400
+        
+        # Serialize the final documents only once
+        base_name = os.path.splitext(secure_filename(spec.get('filename', '')) or 'pipeline_output')[0]
+        if len(docs) == 1:
+            return send_file(
+                io.BytesIO(docs[0].tobytes(**SAVE_PROFILES[save_profile])),
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=f"{base_name}.pdf"
+            )
+        
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for part, doc in enumerate(docs, start=1):
+                zip_file.writestr(f"{base_name}_part_{part}.pdf", doc.tobytes(**SAVE_PROFILES[save_profile]))
+        
+        zip_buffer.seek(0)
+        return send_file(
+            zip_buffer,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=f"{base_name}.zip"
+        )
+    
+    except PipelineTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except PipelineError as e:
+        return jsonify({"error": str(e)}), 400
+    except LeakedTextError as e:
+        return jsonify({"error": str(e), "leaked": e.leaked}), 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if pipeline:
+            pipeline.close()
+
+
+# ==================== METRICS ====================
+
+@bp.route('/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """Report queue depth and budget usage of the admission controller for this worker."""
+    return jsonify(current_app.extensions['admission'].snapshot())
+
+
 if __name__ == "__main__":
+    # WSGI servers use wsgi.py, so importing this module never builds an app
+    app = create_app()
     app.run(debug=True)
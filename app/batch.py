@@ -0,0 +1,258 @@
+"""Headless batch processing of PDFs, without the web app.
+
+Jobs read their inputs directly from disk and write their outputs where the
+job says, so nothing goes through database/uploads/. A manifest (JSON list or
+CSV) describes the jobs; they run in a process pool and every finished job is
+appended to a JSONL journal, so an interrupted batch resumes where it stopped.
+
+Examples (from the app directory):
+
+    python batch.py run manifest.json --journal results.jsonl --workers 8
+    python batch.py merge out.pdf a.pdf b.pdf
+    python batch.py split report.pdf out/ --mode interval --interval 10
+    python batch.py convert out/ scan1.jpg scan2.png
+    python batch.py redact contract.pdf contract_CENSORED.pdf --search "ACME Corp"
+"""
+import os
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def merge_job(inputs, output):
+    from pdf_tools import merge_pdfs
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    merge_pdfs(inputs, output)
+    return [output]
+
+
+def split_job(inputs, output, mode='all', pages='', interval=1):
+    from pdf_tools import split_pdf_all_pages, split_pdf_custom_pages, split_pdf_by_interval
+
+    pdf_path = inputs[0]
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    os.makedirs(output, exist_ok=True)
+
+    if mode == 'all':
+        output_files = split_pdf_all_pages(pdf_path, output, base_name)
+    elif mode == 'custom':
+        page_ranges = [p.strip() for p in pages.split(',')]
+        output_files = split_pdf_custom_pages(pdf_path, output, base_name, page_ranges)
+    elif mode == 'interval':
+        output_files = split_pdf_by_interval(pdf_path, output, base_name, int(interval))
+    else:
+        raise ValueError(f"Invalid split mode: {mode}")
+
+    return [os.path.join(output, filename) for filename in output_files]
+
+
+def convert_job(inputs, output):
+    from convert_tools import convert_image_to_pdf
+
+    os.makedirs(output, exist_ok=True)
+    outputs = []
+    for image_path in inputs:
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        pdf_path = os.path.join(output, f"{base_name}.pdf")
+        convert_image_to_pdf(image_path, pdf_path)
+        outputs.append(pdf_path)
+    return outputs
+
+
+def redact_job(inputs, output, redaction_zones=(), search_terms=(), remove_metadata=True,
+               redaction_color=(0, 0, 0), save_profile='forensic'):
+    from censor_tools import search_text, redact_pdf
+
+    if not redaction_zones and not search_terms:
+        raise ValueError("No redaction zones or search terms specified")
+
+    pdf_path = inputs[0]
+    zones = list(redaction_zones)
+    for term in search_terms:
+        zones.extend(search_text(pdf_path, term))
+
+    # Search terms that match nothing are not an error: the output is still
+    # written with the metadata removed and the chosen save profile
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    redact_pdf(
+        pdf_path,
+        output,
+        zones,
+        remove_metadata=remove_metadata,
+        redaction_color=redaction_color,
+        save_profile=save_profile
+    )
+    return [output]
+
+
+OPERATIONS = {
+    'merge': merge_job,
+    'split': split_job,
+    'convert': convert_job,
+    'redact': redact_job,
+}
+
+
+def run_job(job):
+    """Run one manifest job and return its journal entry. Never raises, errors are reported in the entry."""
+    result = {"id": job['id'], "operation": job['operation']}
+    try:
+        operation = OPERATIONS[job['operation']]
+        options = job.get('options', {})
+        result["outputs"] = operation(job['inputs'], job['output'], **options)
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def load_manifest(manifest_path):
+    """Read jobs from a JSON list or a CSV file.
+
+    Each job has an operation, a list of inputs, an output (file for merge and
+    redact, folder for split and convert), optional operation options and an
+    id; jobs without an id are numbered by their position in the manifest, so
+    give explicit ids if the manifest may be edited before a batch is resumed.
+    Ids must be unique, since the journal records jobs by id.
+    CSV columns: id, operation, inputs (separated by ';'), output, options (JSON).
+    """
+    if manifest_path.endswith('.csv'):
+        with open(manifest_path, newline='') as f:
+            jobs = [{
+                "id": row.get('id') or None,
+                "operation": row['operation'],
+                "inputs": [p.strip() for p in row['inputs'].split(';') if p.strip()],
+                "output": row['output'],
+                "options": json.loads(row['options']) if row.get('options') else {},
+            } for row in csv.DictReader(f)]
+    else:
+        with open(manifest_path) as f:
+            jobs = json.load(f)
+
+    seen_ids = set()
+    for position, job in enumerate(jobs, start=1):
+        if job['operation'] not in OPERATIONS:
+            raise ValueError(f"Unknown operation in job {position}: {job['operation']}")
+        job['id'] = str(job.get('id') or position)
+        if job['id'] in seen_ids:
+            raise ValueError(f"Duplicate id in job {position}: {job['id']}")
+        seen_ids.add(job['id'])
+        job.setdefault('options', {})
+    return jobs
+
+
+def load_journal(journal_path):
+    """Return the ids of the jobs that already succeeded according to a journal."""
+    done = set()
+    if journal_path and os.path.exists(journal_path):
+        with open(journal_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get('status') == 'ok':
+                    done.add(entry['id'])
+    return done
+
+
+def run_batch(jobs, journal_path=None, workers=None):
+    """Run jobs in a process pool, skipping the ones the journal marks as done.
+
+    Jobs run concurrently and in no set order, so a job cannot use the output
+    of another job of the same batch as its input; run such jobs as a second batch.
+
+    Each result is appended to the journal as soon as its job finishes.
+    Returns the results of the jobs that ran.
+    """
+    done = load_journal(journal_path)
+    pending = [job for job in jobs if job['id'] not in done]
+    results = []
+
+    journal = open(journal_path, 'a') if journal_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_job, job) for job in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if journal:
+                    journal.write(json.dumps(result) + '\n')
+                    journal.flush()
+    finally:
+        if journal:
+            journal.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge, split, convert and redact PDFs without the web app.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the jobs of a JSON or CSV manifest")
+    run_parser.add_argument('manifest')
+    run_parser.add_argument('--journal', help="JSONL results journal, used to resume an interrupted batch")
+    run_parser.add_argument('--workers', type=int, help="Worker processes (default: number of CPUs)")
+
+    merge_parser = subparsers.add_parser('merge', help="Merge PDFs in the given order")
+    merge_parser.add_argument('output')
+    merge_parser.add_argument('inputs', nargs='+')
+
+    split_parser = subparsers.add_parser('split', help="Split a PDF into a folder")
+    split_parser.add_argument('input')
+    split_parser.add_argument('output')
+    split_parser.add_argument('--mode', choices=['all', 'custom', 'interval'], default='all')
+    split_parser.add_argument('--pages', default='', help="Page ranges for custom mode, e.g. '1, 3-5, 7'")
+    split_parser.add_argument('--interval', type=int, default=1)
+
+    convert_parser = subparsers.add_parser('convert', help="Convert images to one PDF each in a folder")
+    convert_parser.add_argument('output')
+    convert_parser.add_argument('inputs', nargs='+')
+
+    redact_parser = subparsers.add_parser('redact', help="Permanently redact text from a PDF")
+    redact_parser.add_argument('input')
+    redact_parser.add_argument('output')
+    redact_parser.add_argument('--search', action='append', default=[], help="Text to redact (repeatable)")
+    redact_parser.add_argument('--zones', help="JSON file with redaction zones [{page, x, y, width, height}]")
+    redact_parser.add_argument('--keep-metadata', action='store_true')
+    redact_parser.add_argument('--save-profile', choices=['fast', 'balanced', 'forensic'], default='forensic')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_batch(load_manifest(args.manifest), journal_path=args.journal, workers=args.workers)
+        failed = [r for r in results if r['status'] != 'ok']
+        for result in failed:
+            print(f"{result['id']}: {result['error']}")
+        print(f"{len(results) - len(failed)} job(s) succeeded, {len(failed)} failed")
+        raise SystemExit(1 if failed else 0)
+
+    if args.command == 'merge':
+        outputs = merge_job(args.inputs, args.output)
+    elif args.command == 'split':
+        outputs = split_job([args.input], args.output, mode=args.mode, pages=args.pages, interval=args.interval)
+    elif args.command == 'convert':
+        outputs = convert_job(args.inputs, args.output)
+    else:
+        zones = []
+        if args.zones:
+            with open(args.zones) as f:
+                zones = json.load(f)
+        outputs = redact_job(
+            [args.input],
+            args.output,
+            redaction_zones=zones,
+            search_terms=args.search,
+            remove_metadata=not args.keep_metadata,
+            save_profile=args.save_profile
+        )
+
+    for output in outputs:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import fitz
+
+# Allow running the script directly from the app/ directory or the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from censor_tools import SAVE_PROFILES, redact_document
+
+
+def make_synthetic_pdf(output_path, pages, seed=0):
+    """Write a text-heavy PDF with a photo-like image on every page, like a scanned report with a text layer."""
+    rng = random.Random(seed)
+    words = ["contract", "invoice", "ACME", "Corp", "payment", "client", "account", "number",
+             "confidential", "address", "signature", "amount", "date", "reference", "policy"]
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 72
+        while y < 560:
+            line = " ".join(rng.choice(words) for _ in range(10))
+            page.insert_text((72, y), line, fontsize=10)
+            y += 14
+        # Noise compresses poorly, like a real photo or scan
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 300, 150), False)
+        pix.set_rect(pix.irect, (255, 255, 255))
+        for _ in range(2000):
+            pix.set_pixel(rng.randrange(300), rng.randrange(150), (rng.randrange(256),) * 3)
+        page.insert_image(fitz.Rect(72, 600, 372, 750), pixmap=pix)
+        page.insert_text((72, 780), f"Page {page_num + 1}", fontsize=8)
+    doc.save(output_path)
+    doc.close()
+
+
+def redaction_zones(doc, zones_per_page):
+    """Pick several word zones on every page, the way text search marks them in the censor UI."""
+    zones = []
+    for page_num, page in enumerate(doc, start=1):
+        words = page.get_text("words")
+        step = max(1, len(words) // zones_per_page)
+        for x0, y0, x1, y1, *_ in words[::step][:zones_per_page]:
+            zones.append({"page": page_num, "x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0})
+    return zones
+
+
+def benchmark_profile(pdf_path, profile, repeat, zones_per_page):
+    """Redact several zones per page and save with a profile, returning (best save seconds, total seconds, bytes)."""
+    save_timings = []
+    total_timings = []
+    size = 0
+    for _ in range(repeat):
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            output_path = tmp.name
+        try:
+            start = time.perf_counter()
+            doc = fitz.open(pdf_path)
+            redact_document(doc, redaction_zones(doc, zones_per_page))
+            save_start = time.perf_counter()
+            doc.save(output_path, **SAVE_PROFILES[profile])
+            end = time.perf_counter()
+            doc.close()
+            save_timings.append(end - save_start)
+            total_timings.append(end - start)
+            size = os.path.getsize(output_path)
+        finally:
+            os.remove(output_path)
+
+    return min(save_timings), min(total_timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare censor save profiles on real PDFs.")
+    parser.add_argument('pdfs', nargs='*', help="PDF files to benchmark")
+    parser.add_argument('--synthetic', type=int, metavar='PAGES',
+                        help="Also benchmark a generated text and image PDF with this many pages")
+    parser.add_argument('--zones-per-page', type=int, default=8, help="Redaction zones applied on every page")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per profile (best time is reported)")
+    args = parser.parse_args()
+
+    pdfs = list(args.pdfs)
+    synthetic_path = None
+    if args.synthetic:
+        synthetic_path = os.path.join(tempfile.mkdtemp(), f"synthetic_{args.synthetic}_pages.pdf")
+        make_synthetic_pdf(synthetic_path, args.synthetic)
+        pdfs.append(synthetic_path)
+    if not pdfs:
+        parser.error("give at least one PDF or --synthetic PAGES")
+
+    print("| File | Input (KB) | Profile | Save time (s) | Redact + save (s) | Output size (KB) |")
+    print("|------|------------|---------|---------------|-------------------|------------------|")
+    try:
+        for pdf_path in pdfs:
+            input_kb = os.path.getsize(pdf_path) / 1024
+            for profile in SAVE_PROFILES:
+                save_seconds, total_seconds, size = benchmark_profile(
+                    pdf_path, profile, args.repeat, args.zones_per_page
+                )
+                print(f"| {os.path.basename(pdf_path)} | {input_kb:.0f} | {profile} | {save_seconds:.3f} "
+                      f"| {total_seconds:.3f} | {size / 1024:.0f} |")
+    finally:
+        if synthetic_path:
+            os.remove(synthetic_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+APP_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time spent creating the app in a fresh interpreter, like a worker cold start
+SNIPPET = """
+import time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - start)
+"""
+
+
+def measure(preload, runs):
+    """Return the app creation times of several fresh interpreters, in seconds."""
+    env = dict(os.environ, PRELOAD_OPERATIONS='1' if preload else '0')
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', SNIPPET],
+            cwd=APP_FOLDER, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start time of the app.")
+    parser.add_argument('--runs', type=int, default=10, help="Fresh interpreters per mode")
+    args = parser.parse_args()
+
+    print("| Mode | Median (ms) | Min (ms) | Max (ms) |")
+    print("|------|-------------|----------|----------|")
+    for label, preload in (("lazy imports", False), ("preloaded operations", True)):
+        timings = [t * 1000 for t in measure(preload, args.runs)]
+        print(f"| {label} | {statistics.median(timings):.1f} | {min(timings):.1f} | {max(timings):.1f} |")
+
+
+if __name__ == "__main__":
+    main()
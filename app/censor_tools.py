@@ -0,0 +1,373 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF for secure redaction
+
+# Save options used by PyMuPDF when writing a censored PDF, from cheapest to most thorough.
+# Every profile runs at least garbage=1 so objects orphaned by apply_redactions() are dropped.
+SAVE_PROFILES = {
+    'fast': {'garbage': 1, 'deflate': False, 'clean': False},
+    'balanced': {'garbage': 3, 'deflate': True, 'clean': False},
+    'forensic': {'garbage': 4, 'deflate': True, 'clean': True},
+}
+
+class LeakedTextError(Exception):
+    """Raised when redacted text can still be extracted from a saved PDF."""
+
+    def __init__(self, leaked):
+        super().__init__("Redacted text is still present in the output")
+        self.leaked = leaked
+
+def words_in_rects(page, rects):
+    """Return (rect, word) pairs for words lying mostly inside any of the given rectangles."""
+    found = []
+    for word in page.get_text("words"):
+        word_rect = fitz.Rect(word[:4])
+        for rect in rects:
+            overlap = word_rect & rect
+            if not overlap.is_empty and overlap.get_area() >= 0.5 * word_rect.get_area():
+                found.append((rect, word[4]))
+                break
+    return found
+
+def find_leaked_text_in_document(doc, text_index):
+    """Return the indexed words that can still be extracted from the redacted areas of an open document.
+
+    text_index maps page numbers to the (rect, word) pairs recorded before redaction.
+    """
+    leaked = []
+    for page_num, entries in text_index.items():
+        rects = [rect for rect, _ in entries]
+        remaining = {(tuple(rect), word) for rect, word in words_in_rects(doc[page_num - 1], rects)}
+        for rect, word in entries:
+            if (tuple(rect), word) in remaining:
+                leaked.append({"page": page_num, "text": word})
+    return leaked
+
+def find_leaked_text(pdf_path, text_index):
+    """Return the indexed words that can still be extracted from the redacted areas of a saved PDF."""
+    doc = fitz.open(pdf_path)
+    try:
+        return find_leaked_text_in_document(doc, text_index)
+    finally:
+        doc.close()
+
+def search_text(pdf_path, search_term):
+    """Search for text in a PDF and return the matches as redaction zones."""
+    doc = fitz.open(pdf_path)
+    try:
+        return search_text_in_document(doc, search_term)
+    finally:
+        doc.close()
+
+def search_text_in_document(doc, search_term):
+    """Search for text in an open document and return the matches as redaction zones."""
+    results = []
+    
+    for page_num in range(len(doc)):
+        page = doc[page_num]
+        
+        # Search for text
+        text_instances = page.search_for(
+            search_term,
+            quads=False  # Returns rectangles instead of quads
+        ) or []  # None for an empty search term
+        
+        for rect in text_instances:
+            results.append({
+                "page": page_num + 1,
+                "x": rect.x0,
+                "y": rect.y0,
+                "width": rect.x1 - rect.x0,
+                "height": rect.y1 - rect.y0
+            })
+    
+    return results
+
+def redact_document(doc, redaction_zones, remove_metadata=True, redaction_color=(0, 0, 0)):
+    """Permanently redact zones ({page, x, y, width, height}) of an open document.
+
+    Returns the text index of the redacted words ({page_number: [(rect, word)]}),
+    to check the result with find_leaked_text() or find_leaked_text_in_document().
+    """
+    # Group redaction zones by page for efficient processing
+    zones_by_page = {}
+    for zone in redaction_zones:
+        page_num = zone.get('page', 1)
+        if page_num not in zones_by_page:
+            zones_by_page[page_num] = []
+        zones_by_page[page_num].append(zone)
+    
+    # Index the text under each zone so the saved output can be checked for leaks
+    text_index = {}
+    
+    # Apply redactions to each page
+    for page_num, zones in zones_by_page.items():
+        if page_num < 1 or page_num > len(doc):
+            continue
+        
+        page = doc[page_num - 1]
+        rects = []
+        
+        for zone in zones:
+            # Create rectangle for redaction
+            # Coordinates are in PDF space
+            x = zone.get('x', 0)
+            y = zone.get('y', 0)
+            width = zone.get('width', 0)
+            height = zone.get('height', 0)
+            
+            rect = fitz.Rect(x, y, x + width, y + height)
+            rects.append(rect)
+            
+            # Add redaction annotation (marks area for permanent removal)
+            page.add_redact_annot(
+                rect,
+                fill=redaction_color  # Color of redaction box
+            )
+        
+        words = words_in_rects(page, rects)
+        if words:
+            text_index[page_num] = words
+        
+        # Apply all redactions on this page (permanently removes content)
+        # Using simple apply_redactions() which removes all content by default
+        page.apply_redactions()
+    
+    # Remove metadata if requested
+    if remove_metadata:
+        # Clear all metadata
+        doc.set_metadata({})
+        
+        # Remove XMP metadata
+        doc.del_xml_metadata()
+    
+    return text_index
+
+def redact_pdf(pdf_path, output_path, redaction_zones, remove_metadata=True,
+               redaction_color=(0, 0, 0), save_profile='forensic'):
+    """Permanently redact zones ({page, x, y, width, height}) of a PDF and save the result.
+
+    The text under the zones is checked again in the saved file; if any of it
+    survived, the output is deleted and LeakedTextError is raised.
+    Returns the number of words that were verified as removed.
+    """
+    if save_profile not in SAVE_PROFILES:
+        raise ValueError(f"Unknown save profile: {save_profile}")
+    
+    # Open PDF with PyMuPDF
+    doc = fitz.open(pdf_path)
+    text_index = redact_document(
+        doc,
+        redaction_zones,
+        remove_metadata=remove_metadata,
+        redaction_color=redaction_color
+    )
+    
+    # Save with the options of the selected profile (garbage collection, compression, sanitizing)
+    doc.save(output_path, **SAVE_PROFILES[save_profile])
+    doc.close()
+    
+    # Make sure none of the redacted text survived in the saved file
+    leaked = find_leaked_text(output_path, text_index)
+    if leaked:
+        os.remove(output_path)
+        raise LeakedTextError(leaked)
+    
+    return sum(len(words) for words in text_index.values())
+
+# Process pool shared by OCR requests, created on first use (never before a worker forks)
+ocr_executor = None
+# Guards creating and replacing the pool when a worker serves requests in threads
+ocr_executor_lock = threading.Lock()
+
+def get_ocr_executor(max_workers):
+    """Return the OCR process pool, creating it the first time it is needed."""
+    global ocr_executor
+    with ocr_executor_lock:
+        if ocr_executor is None:
+            ocr_executor = ProcessPoolExecutor(max_workers=max_workers)
+        return ocr_executor
+
+def reset_ocr_executor(broken):
+    """Drop a broken OCR pool (e.g. a worker killed by the OOM killer) so the next call starts a new one.
+
+    Only the pool the caller saw break is dropped: if another request already
+    replaced it, the new pool is kept.
+    """
+    global ocr_executor
+    with ocr_executor_lock:
+        if ocr_executor is broken:
+            ocr_executor = None
+    broken.shutdown(wait=False)
+
+def ocr_window(workers):
+    """Number of rendered pages an OCR request keeps in flight: two per pool worker."""
+    return 2 * (workers or os.cpu_count() or 1)
+
+def run_ocr_jobs(render_page, page_nums, language, workers):
+    """OCR pages in the process pool and yield (page_num, words) as each one finishes.
+
+    render_page(page_num) returns the PNG bytes of a page. Pages are only rendered
+    when a slot is free, so at most ocr_window(workers) rendered pages are held in
+    memory at once. If the pool is broken, it is replaced and the unfinished pages
+    are retried once; a second failure is raised so only this request fails.
+    """
+    window = ocr_window(workers)
+    done_pages = set()
+    for attempt in range(2):
+        queue = deque(page_num for page_num in page_nums if page_num not in done_pages)
+        if not queue:
+            return
+        in_flight = {}  # future -> page_num
+        executor = get_ocr_executor(workers)
+        try:
+            while queue or in_flight:
+                while queue and len(in_flight) < window:
+                    page_num = queue.popleft()
+                    in_flight[executor.submit(ocr_image, render_page(page_num), language)] = page_num
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    page_num = in_flight.pop(future)
+                    words = future.result()
+                    done_pages.add(page_num)
+                    yield page_num, words
+            return
+        except BrokenProcessPool:
+            reset_ocr_executor(executor)
+            if attempt:
+                raise
+        finally:
+            # Drop the pages of this request still waiting in the pool if the caller stopped early
+            for future in in_flight:
+                future.cancel()
+
+def write_cache_file(cache_path, words):
+    """Write a cache entry atomically, so concurrent readers never see a half-written file."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(words, f)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def page_cache_key(doc, page, language, dpi):
+    """Hash what a scanned page shows, its content stream and embedded image streams, without rendering it."""
+    digest = hashlib.sha256(f"{language}:{dpi}:{tuple(page.rect)}:{page.rotation}".encode())
+    digest.update(page.read_contents())
+    for image in page.get_images():
+        for xref in image[:2]:  # The image and its soft mask, if any
+            if xref:
+                digest.update(doc.xref_stream_raw(xref) or b'')
+    return digest.hexdigest()
+
+def is_scanned_page(page):
+    """A page needs OCR when it shows images but has no extractable text."""
+    return not page.get_text().strip() and len(page.get_images()) > 0
+
+def ocr_image(png_bytes, language):
+    """Run Tesseract on a rendered page and return its words with coordinates relative to the page size.
+
+    Runs in a worker process, so it only receives and returns plain picklable data.
+    """
+    pix = fitz.Pixmap(png_bytes)
+    ocr_doc = fitz.open("pdf", pix.pdfocr_tobytes(language=language))
+    try:
+        ocr_page = ocr_doc[0]
+        width, height = ocr_page.rect.width, ocr_page.rect.height
+        return [
+            [x0 / width, y0 / height, x1 / width, y1 / height, text]
+            for x0, y0, x1, y1, text, *_ in ocr_page.get_text("words")
+        ]
+    finally:
+        ocr_doc.close()
+
+def ocr_font():
+    """Font of the invisible OCR text: the built-in Droid Sans Fallback covers Latin, Greek, Cyrillic and CJK."""
+    return fitz.Font("cjk")
+
+def insert_invisible_words(page, words, font):
+    """Write OCR words onto a page as invisible text so search and redaction can find them.
+
+    The font size is chosen so the glyph boxes (ascender to descender) fill the
+    word box exactly, and each word is stretched horizontally to the box width.
+    """
+    if not words:
+        return
+    # Embedded once per document; ocr_pdf() subsets it before saving
+    page.insert_font(fontname="ocrfont", fontbuffer=font.buffer)
+    rect = page.rect
+    for x0, y0, x1, y1, text in words:
+        word_rect = fitz.Rect(x0 * rect.width, y0 * rect.height, x1 * rect.width, y1 * rect.height)
+        fontsize = word_rect.height / (font.ascender - font.descender)
+        natural_width = font.text_length(text, fontsize=fontsize)
+        if fontsize <= 0 or natural_width <= 0:
+            continue
+        origin = fitz.Point(word_rect.x0, word_rect.y1 + font.descender * fontsize)
+        page.insert_text(
+            origin,
+            text,
+            fontname="ocrfont",
+            fontsize=fontsize,
+            render_mode=3,  # Invisible text
+            morph=(origin, fitz.Matrix(word_rect.width / natural_width, 1))
+        )
+
+def ocr_pdf(pdf_path, cache_folder, language='eng', dpi=300, workers=None):
+    """Add an invisible OCR text layer to the scanned pages of a PDF, in place.
+
+    Results are cached by a hash of the page content and embedded images, so cached
+    pages are never rendered and repeated runs on the same scans skip Tesseract.
+    The other pages are rendered a few at a time (see run_ocr_jobs) and their words
+    are written as soon as they come back. Returns (ocr_pages, cached_pages).
+    """
+    zoom = dpi / 72
+    font = ocr_font()
+    doc = fitz.open(pdf_path)
+    try:
+        pending = {}  # page_num -> cache path
+        ocr_pages = 0
+        cached_pages = 0
+
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            if not is_scanned_page(page):
+                continue
+
+            cache_path = os.path.join(cache_folder, f"{page_cache_key(doc, page, language, dpi)}.json")
+            if os.path.exists(cache_path):
+                with open(cache_path, 'r') as f:
+                    insert_invisible_words(page, json.load(f), font)
+                ocr_pages += 1
+                cached_pages += 1
+            else:
+                pending[page_num] = cache_path
+
+        def render_page(page_num):
+            return doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+
+        for page_num, words in run_ocr_jobs(render_page, list(pending), language, workers):
+            write_cache_file(pending[page_num], words)
+            insert_invisible_words(doc[page_num], words, font)
+            ocr_pages += 1
+
+        if not ocr_pages:
+            return 0, 0
+
+        # Keep only the glyphs of the OCR font the words use, instead of the whole font
+        doc.subset_fonts()
+        temp_path = pdf_path + '_ocr.pdf'
+        doc.save(temp_path, garbage=1, deflate=True)
+    finally:
+        doc.close()
+
+    os.replace(temp_path, pdf_path)
+    return ocr_pages, cached_pages
@@ -0,0 +1,23 @@
+import io
+
+from PIL import Image
+import img2pdf
+
+def image_to_pdf_bytes(image_data):
+    """Convert the bytes of an image to the bytes of a one-page PDF. Raises an exception if it is not a valid image."""
+    with Image.open(io.BytesIO(image_data)) as img:
+        # Convert to RGB if necessary (for PNG with transparency, etc.)
+        if img.mode not in ('RGB', 'L'):
+            buffer = io.BytesIO()
+            img.convert('RGB').save(buffer, 'JPEG')
+            return img2pdf.convert(buffer.getvalue())
+    
+    return img2pdf.convert(image_data)
+
+def convert_image_to_pdf(image_path, pdf_path):
+    """Convert a single image file to a PDF file. Raises an exception if the file is not a valid image."""
+    with open(image_path, 'rb') as f:
+        pdf_bytes = image_to_pdf_bytes(f.read())
+    
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf_bytes)
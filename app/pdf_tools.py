@@ -0,0 +1,102 @@
+import os
+
+import PyPDF2
+
+def merge_pdfs(pdf_list, output_path):
+    """Merge a list of PDFs into one PDF and save it to the specified path."""
+    pdf_merger = PyPDF2.PdfMerger()
+    
+    for pdf in pdf_list:
+        pdf_merger.append(pdf)
+    
+    with open(output_path, 'wb') as output_pdf:
+        pdf_merger.write(output_pdf)
+
+def get_pdf_page_count(pdf_path):
+    """Get the number of pages in a PDF."""
+    with open(pdf_path, 'rb') as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        return len(pdf_reader.pages)
+
+def split_pdf_all_pages(pdf_path, output_folder, base_name):
+    """Split PDF into individual pages."""
+    output_files = []
+    with open(pdf_path, 'rb') as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        total_pages = len(pdf_reader.pages)
+        
+        for page_num in range(total_pages):
+            pdf_writer = PyPDF2.PdfWriter()
+            pdf_writer.add_page(pdf_reader.pages[page_num])
+            
+            output_filename = f"{base_name}_page_{page_num + 1}.pdf"
+            output_path = os.path.join(output_folder, output_filename)
+            
+            with open(output_path, 'wb') as output_file:
+                pdf_writer.write(output_file)
+            
+            output_files.append(output_filename)
+    
+    return output_files
+
+def split_pdf_custom_pages(pdf_path, output_folder, base_name, page_ranges):
+    """Split PDF by custom page ranges."""
+    output_files = []
+    with open(pdf_path, 'rb') as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        total_pages = len(pdf_reader.pages)
+        
+        for idx, page_range in enumerate(page_ranges):
+            pdf_writer = PyPDF2.PdfWriter()
+            
+            # Parse page range
+            if '-' in page_range:
+                start, end = map(int, page_range.split('-'))
+                pages = range(start - 1, min(end, total_pages))
+            else:
+                page_num = int(page_range) - 1
+                if 0 <= page_num < total_pages:
+                    pages = [page_num]
+                else:
+                    continue
+            
+            for page_num in pages:
+                if 0 <= page_num < total_pages:
+                    pdf_writer.add_page(pdf_reader.pages[page_num])
+            
+            if len(pdf_writer.pages) > 0:
+                output_filename = f"{base_name}_part_{idx + 1}.pdf"
+                output_path = os.path.join(output_folder, output_filename)
+                
+                with open(output_path, 'wb') as output_file:
+                    pdf_writer.write(output_file)
+                
+                output_files.append(output_filename)
+    
+    return output_files
+
+def split_pdf_by_interval(pdf_path, output_folder, base_name, interval):
+    """Split PDF by page interval."""
+    output_files = []
+    with open(pdf_path, 'rb') as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        total_pages = len(pdf_reader.pages)
+        
+        part = 1
+        for start_page in range(0, total_pages, interval):
+            pdf_writer = PyPDF2.PdfWriter()
+            end_page = min(start_page + interval, total_pages)
+            
+            for page_num in range(start_page, end_page):
+                pdf_writer.add_page(pdf_reader.pages[page_num])
+            
+            output_filename = f"{base_name}_part_{part}.pdf"
+            output_path = os.path.join(output_folder, output_filename)
+            
+            with open(output_path, 'wb') as output_file:
+                pdf_writer.write(output_file)
+            
+            output_files.append(output_filename)
+            part += 1
+    
+    return output_files
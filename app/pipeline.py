@@ -0,0 +1,205 @@
+import fitz  # PyMuPDF keeps the intermediate documents in memory
+
+from censor_tools import search_text_in_document, redact_document, find_leaked_text_in_document, LeakedTextError
+from convert_tools import image_to_pdf_bytes
+
+# Operations a pipeline step can run; every step turns a list of documents into a list of documents
+PIPELINE_OPERATIONS = ('convert', 'merge', 'redact', 'split')
+
+
+class PipelineError(ValueError):
+    """Raised when a pipeline description is invalid."""
+
+
+class PipelineTooLarge(PipelineError):
+    """Raised when a document of the pipeline has more pages than allowed."""
+
+
+def copy_document(doc):
+    """Copy the pages of an open document into a new one, without serializing it."""
+    copy = fitz.open()
+    copy.insert_pdf(doc)
+    return copy
+
+
+def split_page_groups(total_pages, mode, pages='', interval=1):
+    """Return the page indexes of each part, with the same rules as the /split/execute modes."""
+    if mode == 'all':
+        return [[page_num] for page_num in range(total_pages)]
+
+    if mode == 'interval':
+        if interval < 1:
+            raise PipelineError("Please specify a valid interval")
+        return [list(range(start, min(start + interval, total_pages))) for start in range(0, total_pages, interval)]
+
+    if mode == 'custom':
+        groups = []
+        for page_range in (p.strip() for p in pages.split(',') if p.strip()):
+            try:
+                if '-' in page_range:
+                    start, end = map(int, page_range.split('-'))
+                    group = [page_num for page_num in range(start - 1, min(end, total_pages)) if page_num >= 0]
+                else:
+                    page_num = int(page_range) - 1
+                    group = [page_num] if 0 <= page_num < total_pages else []
+            except ValueError:
+                raise PipelineError(f"Invalid page range: {page_range}")
+            if group:
+                groups.append(group)
+        return groups
+
+    raise PipelineError(f"Invalid split mode: {mode}")
+
+
+def is_list_of(value, types):
+    return isinstance(value, list) and all(isinstance(item, types) for item in value)
+
+
+def validate_step_options(step):
+    """Check the types of the options of a step, so bad input is reported instead of failing mid-run."""
+    step_id = step['id']
+    if not is_list_of(step['inputs'], str):
+        raise PipelineError(f"Step {step_id}: inputs must be a list of names")
+
+    if step['op'] == 'redact':
+        if not is_list_of(step.get('redaction_zones', []), dict):
+            raise PipelineError(f"Step {step_id}: redaction_zones must be a list of zone objects")
+        for zone in step.get('redaction_zones', []):
+            if not all(isinstance(zone.get(key, 0), (int, float)) for key in ('page', 'x', 'y', 'width', 'height')):
+                raise PipelineError(f"Step {step_id}: zone page, x, y, width and height must be numbers")
+        search_terms = step.get('search_terms', [])
+        if not is_list_of(search_terms, str) or not all(term.strip() for term in search_terms):
+            raise PipelineError(f"Step {step_id}: search_terms must be a list of non-empty strings")
+        color = step.get('redaction_color', [0, 0, 0])
+        if not is_list_of(color, (int, float)) or len(color) != 3:
+            raise PipelineError(f"Step {step_id}: redaction_color must be a list of 3 numbers")
+
+    if step['op'] == 'split':
+        interval = step.get('interval', 1)
+        if not isinstance(interval, int) or isinstance(interval, bool):
+            raise PipelineError(f"Step {step_id}: interval must be an integer")
+        if not isinstance(step.get('pages', ''), str):
+            raise PipelineError(f"Step {step_id}: pages must be a string like '1, 3-5'")
+
+
+class Pipeline:
+    """Run a DAG of operations over uploaded files, keeping every intermediate document open in memory.
+
+    spec is {"steps": [{"id", "op", "inputs": [...], ...options}], "output": step_id}.
+    A step input is either the name of an uploaded file or the id of another step.
+    """
+
+    def __init__(self, spec, files, max_pages=None):
+        self.steps = {}
+        if not is_list_of(spec.get('steps', []), dict):
+            raise PipelineError("steps must be a list of step objects")
+        for step in spec.get('steps', []):
+            step_id = step.get('id')
+            if not isinstance(step_id, str) or not step_id or step_id in self.steps or step_id in files:
+                raise PipelineError(f"Every step needs a unique id that is not a file name: {step_id!r}")
+            if step.get('op') not in PIPELINE_OPERATIONS:
+                raise PipelineError(f"Unknown operation in step {step_id}: {step.get('op')!r}")
+            if not step.get('inputs'):
+                raise PipelineError(f"Step {step_id} has no inputs")
+            validate_step_options(step)
+            self.steps[step_id] = step
+
+        self.output = spec.get('output')
+        if not isinstance(self.output, str) or self.output not in self.steps:
+            raise PipelineError("The output must be the id of a step")
+
+        self.files = files  # name -> bytes
+        self.max_pages = max_pages
+        self.results = {}  # step id or PDF file name -> list of open documents
+        self.running = set()
+
+    def run(self):
+        """Run the steps the output depends on and return its documents."""
+        return self.resolve(self.output)
+
+    def close(self):
+        """Close every document opened by the pipeline."""
+        for docs in self.results.values():
+            for doc in docs:
+                doc.close()
+        self.results = {}
+
+    def resolve(self, name):
+        if name in self.results:
+            return self.results[name]
+
+        if name in self.steps:
+            if name in self.running:
+                raise PipelineError(f"The pipeline has a cycle through step {name}")
+            self.running.add(name)
+            step = self.steps[name]
+            docs = getattr(self, 'run_' + step['op'])(step)
+            self.running.discard(name)
+        elif name in self.files:
+            if not name.lower().endswith('.pdf'):
+                raise PipelineError(f"{name} is not a PDF, add a convert step for it")
+            docs = [fitz.open("pdf", self.files[name])]
+        else:
+            raise PipelineError(f"Unknown input: {name}")
+
+        self.results[name] = docs
+        for doc in docs:
+            if self.max_pages and len(doc) > self.max_pages:
+                raise PipelineTooLarge(f"{name} has {len(doc)} pages, the maximum is {self.max_pages}")
+        return docs
+
+    def step_inputs(self, step):
+        return [doc for name in step['inputs'] for doc in self.resolve(name)]
+
+    def run_convert(self, step):
+        docs = []
+        for name in step['inputs']:
+            if name in self.files and not name.lower().endswith('.pdf'):
+                docs.append(fitz.open("pdf", image_to_pdf_bytes(self.files[name])))
+            else:
+                raise PipelineError(f"Step {step['id']}: convert only takes uploaded images, not {name}")
+        return docs
+
+    def run_merge(self, step):
+        merged = fitz.open()
+        for doc in self.step_inputs(step):
+            merged.insert_pdf(doc)
+        return [merged]
+
+    def run_redact(self, step):
+        docs = []
+        for source in self.step_inputs(step):
+            doc = copy_document(source)
+            docs.append(doc)
+            zones = list(step.get('redaction_zones', []))
+            for term in step.get('search_terms', []):
+                zones.extend(search_text_in_document(doc, term))
+
+            text_index = redact_document(
+                doc,
+                zones,
+                remove_metadata=step.get('remove_metadata', True),
+                redaction_color=step.get('redaction_color', [0, 0, 0])
+            )
+
+            # The document is only saved at the end, so check the redacted pages in memory
+            leaked = find_leaked_text_in_document(doc, text_index)
+            if leaked:
+                raise LeakedTextError(leaked)
+        return docs
+
+    def run_split(self, step):
+        docs = []
+        for source in self.step_inputs(step):
+            groups = split_page_groups(
+                len(source),
+                step.get('mode', 'all'),
+                pages=step.get('pages', ''),
+                interval=step.get('interval', 1)
+            )
+            for group in groups:
+                part = fitz.open()
+                for page_num in group:
+                    part.insert_pdf(source, from_page=page_num, to_page=page_num)
+                docs.append(part)
+        return docs
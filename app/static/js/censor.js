@@ -47,6 +47,7 @@ document.addEventListener('DOMContentLoaded', function() {
   
   const removeMetadataCheckbox = document.getElementById('remove-metadata-checkbox');
   const redactionColorSelect = document.getElementById('redaction-color-select');
+  const saveProfileSelect = document.getElementById('save-profile-select');
   
   const previewBtn = document.getElementById('preview-redaction-btn');
   const cancelBtn = document.getElementById('cancel-censor-btn');
@@ -110,6 +111,21 @@ document.addEventListener('DOMContentLoaded', function() {
         throw new Error(data.error || 'Upload failed');
       }
       
+      // Add a text layer to scanned pages so text search can find matches on them
+      if (data.scanned_pages > 0) {
+        const ocrResponse = await fetch('/censor/ocr', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ filename: data.filename })
+        });
+        
+        const ocrData = await ocrResponse.json();
+        
+        if (!ocrResponse.ok || !ocrData.success) {
+          console.warn('OCR failed, text search will not work on scanned pages:', ocrData.error);
+        }
+      }
+      
       // Store file information
       currentFile = file;
       currentFilename = data.filename;
@@ -465,7 +481,8 @@ document.addEventListener('DOMContentLoaded', function() {
             filename: currentFilename,
             redaction_zones: redactionZones,
             remove_metadata: removeMetadataCheckbox.checked,
-            redaction_color: colorValue
+            redaction_color: colorValue,
+            save_profile: saveProfileSelect.value
           })
         });
         
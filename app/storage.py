@@ -0,0 +1,217 @@
+import os
+import tempfile
+
+# Config keys of the folders each storage area maps to
+STORAGE_AREAS = {
+    'uploads': 'UPLOAD_FOLDER',
+    'merged': 'MERGED_FOLDER',
+    'split': 'SPLIT_FOLDER',
+    'censored': 'CENSORED_FOLDER',
+    'converted': 'CONVERTED_FOLDER',
+}
+
+
+class LocalStorage:
+    """Store files in the local folders configured in app.config (single node)."""
+
+    # Stored files are already on this node, reading them costs no transfer
+    remote = False
+
+    def __init__(self, config):
+        self.folders = {area: config[key] for area, key in STORAGE_AREAS.items()}
+        self.counter_file = config['COUNTER_FILE']
+        for folder in self.folders.values():
+            os.makedirs(folder, exist_ok=True)
+
+    def folder(self, area):
+        """Return the local folder where the files of an area are read or written."""
+        return self.folders[area]
+
+    def path(self, area, name):
+        return os.path.join(self.folder(area), name)
+
+    def fetch(self, area, name):
+        """Return a local path to the stored file, or None if it does not exist."""
+        file_path = self.path(area, name)
+        return file_path if os.path.exists(file_path) else None
+
+    def size(self, area, name):
+        """Return the size in bytes of a stored file, or None if it does not exist."""
+        file_path = self.fetch(area, name)
+        return os.path.getsize(file_path) if file_path else None
+
+    def commit(self, area, name):
+        """Persist a file written at path(area, name). Local files are already in place."""
+
+    def release(self, area, name):
+        """Drop the working copy of a file that is no longer needed on this node. Local files are the stored ones."""
+
+    def delete(self, area, name):
+        """Delete a stored file, ignoring files that are already gone."""
+        try:
+            os.remove(self.path(area, name))
+        except OSError:
+            pass
+
+    def read_counter(self):
+        """Return the merge counter, creating it if it doesn't exist."""
+        if not os.path.exists(self.counter_file):
+            with open(self.counter_file, 'w') as f:
+                f.write('0')
+        with open(self.counter_file, 'r') as f:
+            return int(f.read().strip())
+
+    def increment_counter(self):
+        """Increment the merge counter and return the new value."""
+        count = self.read_counter() + 1
+        with open(self.counter_file, 'w') as f:
+            f.write(str(count))
+        return count
+
+
+class S3Storage:
+    """Store files in an S3-compatible bucket (AWS S3, MinIO, ...) shared by all nodes.
+
+    Files are processed from a node-local scratch folder: fetch() downloads the
+    object there (reusing a copy whose ETag still matches), commit() uploads it
+    back and release() deletes the copy. The merge counter is a single object
+    updated with conditional writes, so concurrent nodes never reuse a value.
+    """
+
+    COUNTER_KEY = 'merge_counter.txt'
+    remote = True
+
+    def __init__(self, config, client=None):
+        if client is None:
+            import boto3  # Only needed when the S3 backend is selected
+
+            client = boto3.client(
+                's3',
+                endpoint_url=config.get('S3_ENDPOINT_URL') or None,
+                region_name=config.get('S3_REGION') or None,
+            )
+        self.client = client
+        # ETag of the object each scratch copy was downloaded from or uploaded as
+        self.scratch_etags = {}
+        self.bucket = config['S3_BUCKET']
+        self.prefix = config.get('S3_PREFIX', '')
+        self.scratch_folder = config.get('STORAGE_SCRATCH_FOLDER') or tempfile.mkdtemp(prefix='pdf_manipulator_')
+        for area in STORAGE_AREAS:
+            os.makedirs(os.path.join(self.scratch_folder, area), exist_ok=True)
+
+    def key(self, area, name):
+        return f"{self.prefix}{area}/{name}"
+
+    def folder(self, area):
+        """Return the scratch folder where the files of an area are read or written."""
+        return os.path.join(self.scratch_folder, area)
+
+    def path(self, area, name):
+        return os.path.join(self.folder(area), name)
+
+    def _head(self, area, name):
+        """Return the HEAD response of an object, or None if it does not exist."""
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(area, name))
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
+
+    def fetch(self, area, name):
+        """Return the path of an up-to-date scratch copy of the object, or None if it does not exist.
+
+        The object is only downloaded when there is no copy yet or when it changed
+        in the bucket (different ETag or size).
+        """
+        head = self._head(area, name)
+        if head is None:
+            self.release(area, name)
+            return None
+
+        file_path = self.path(area, name)
+        up_to_date = (
+            self.scratch_etags.get((area, name)) == head['ETag']
+            and os.path.exists(file_path)
+            and os.path.getsize(file_path) == head['ContentLength']
+        )
+        if not up_to_date:
+            self.client.download_file(self.bucket, self.key(area, name), file_path)
+            self.scratch_etags[(area, name)] = head['ETag']
+        return file_path
+
+    def size(self, area, name):
+        """Return the size in bytes of an object from its metadata, without downloading it."""
+        head = self._head(area, name)
+        return head['ContentLength'] if head else None
+
+    def commit(self, area, name):
+        """Upload the file written at path(area, name) to the bucket, keeping it as the scratch copy."""
+        self.client.upload_file(self.path(area, name), self.bucket, self.key(area, name))
+        head = self._head(area, name)
+        if head is not None:
+            self.scratch_etags[(area, name)] = head['ETag']
+
+    def release(self, area, name):
+        """Delete the scratch copy of a file; the object stays in the bucket."""
+        self.scratch_etags.pop((area, name), None)
+        try:
+            os.remove(self.path(area, name))
+        except OSError:
+            pass
+
+    def delete(self, area, name):
+        """Delete the object and its scratch copy."""
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(area, name))
+        self.release(area, name)
+
+    def _get_counter(self):
+        """Return (value, etag) of the counter object, or (0, None) if it doesn't exist yet."""
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + self.COUNTER_KEY)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return 0, None
+            raise
+        return int(response['Body'].read().decode().strip()), response['ETag']
+
+    def read_counter(self):
+        return self._get_counter()[0]
+
+    def increment_counter(self):
+        """Increment the shared counter with compare-and-swap, retrying when another node won the race."""
+        from botocore.exceptions import ClientError
+
+        while True:
+            count, etag = self._get_counter()
+            condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+            try:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.prefix + self.COUNTER_KEY,
+                    Body=str(count + 1).encode(),
+                    **condition
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409'):
+                    continue
+                raise
+            return count + 1
+
+
+STORAGE_BACKENDS = {
+    'local': LocalStorage,
+    's3': S3Storage,
+}
+
+
+def create_storage(config):
+    """Build the storage backend selected by config['STORAGE_BACKEND']."""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return STORAGE_BACKENDS[backend](config)
@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import WeightedSemaphore, AdmissionController, TooLarge, admission_controlled
+
+
+def acquire_in_thread(semaphore, weight, timeout, results):
+    thread = threading.Thread(target=lambda: results.append(semaphore.acquire(weight, timeout)))
+    thread.start()
+    return thread
+
+
+def wait_for_queue(semaphore, length):
+    deadline = time.monotonic() + 2
+    while semaphore.queued != length:
+        assert time.monotonic() < deadline, "the request never queued"
+        time.sleep(0.01)
+
+
+def test_requests_within_budget_are_admitted():
+    semaphore = WeightedSemaphore(budget=10, max_queue=5)
+    assert semaphore.acquire(4, timeout=0) == 4
+    assert semaphore.acquire(6, timeout=0) == 6
+    assert semaphore.snapshot()["in_use"] == 10
+    semaphore.release(4)
+    semaphore.release(6)
+    assert semaphore.snapshot()["running"] == 0
+
+
+def test_request_bigger_than_budget_runs_alone():
+    semaphore = WeightedSemaphore(budget=10, max_queue=5)
+    assert semaphore.acquire(50, timeout=0) == 10
+    assert semaphore.acquire(1, timeout=0.05) is False
+
+
+def test_waiting_request_times_out():
+    semaphore = WeightedSemaphore(budget=10, max_queue=5)
+    semaphore.acquire(10, timeout=0)
+    start = time.monotonic()
+    assert semaphore.acquire(1, timeout=0.1) is False
+    assert time.monotonic() - start >= 0.1
+    assert semaphore.snapshot()["rejected_total"] == 1
+    assert semaphore.queued == 0
+
+
+def test_full_queue_rejects_immediately():
+    semaphore = WeightedSemaphore(budget=10, max_queue=1)
+    semaphore.acquire(10, timeout=0)
+    results = []
+    waiter = acquire_in_thread(semaphore, 5, 2, results)
+    wait_for_queue(semaphore, 1)
+
+    start = time.monotonic()
+    assert semaphore.acquire(1, timeout=2) is False
+    assert time.monotonic() - start < 1
+
+    semaphore.release(10)
+    waiter.join()
+    assert results == [5]
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    semaphore = WeightedSemaphore(budget=10, max_queue=5)
+    semaphore.acquire(8, timeout=0)
+    results = []
+    big = acquire_in_thread(semaphore, 5, 2, results)
+    wait_for_queue(semaphore, 1)
+
+    # A small request would fit in the remaining budget, but must not overtake the big one
+    assert semaphore.acquire(1, timeout=0.1) is False
+    assert results == []
+
+    semaphore.release(8)
+    big.join()
+    assert results == [5]
+    assert semaphore.acquire(1, timeout=0) == 1
+
+
+def make_app(estimate_cost, view=None):
+    app = Flask(__name__)
+    app.extensions['admission'] = AdmissionController({'op': 10}, max_queue=0, queue_timeout=0, retry_after=7)
+
+    @app.route('/work')
+    @admission_controlled('op', estimate_cost)
+    def work():
+        return view() if view else jsonify({"ok": True})
+
+    return app
+
+
+def test_decorator_admits_and_releases():
+    app = make_app(lambda: {"size_bytes": 3 * 1024 * 1024})
+    response = app.test_client().get('/work')
+    assert response.status_code == 200
+    snapshot = app.extensions['admission'].snapshot()['op']
+    assert snapshot["admitted_total"] == 1
+    assert snapshot["in_use"] == 0
+
+
+def test_decorator_releases_when_the_view_fails():
+    def view():
+        raise RuntimeError("boom")
+
+    app = make_app(lambda: {}, view)
+    assert app.test_client().get('/work').status_code == 500
+    assert app.extensions['admission'].snapshot()['op']["running"] == 0
+
+
+def test_overloaded_answers_429_with_retry_after():
+    app = make_app(lambda: {})
+    app.extensions['admission'].acquire('op', 10)
+
+    response = app.test_client().get('/work')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '7'
+    assert "retry later" in response.get_json()["error"]
+
+
+def test_too_large_answers_413():
+    def estimate_cost():
+        raise TooLarge("PDF has 5000 pages, the maximum is 2000")
+
+    app = make_app(estimate_cost)
+    response = app.test_client().get('/work')
+    assert response.status_code == 413
+    assert response.get_json() == {"error": "PDF has 5000 pages, the maximum is 2000"}
+    assert app.extensions['admission'].snapshot()['op']["admitted_total"] == 0
+
+
+@pytest.fixture
+def pdf_app(tmp_path):
+    from app import create_app
+    from storage import STORAGE_AREAS
+
+    config = {key: str(tmp_path / area) for area, key in STORAGE_AREAS.items()}
+    config.update({
+        'OCR_CACHE_FOLDER': str(tmp_path / 'ocr_cache'),
+        'COUNTER_FILE': str(tmp_path / 'merge_counter.txt'),
+        'MAX_PAGES': 3,
+    })
+    return create_app(config)
+
+
+@pytest.mark.parametrize("body", [[1], "name.pdf", {"filename": 5}])
+def test_stored_pdf_requests_with_bad_bodies_get_json_errors(pdf_app, body):
+    response = pdf_app.test_client().post('/split/execute', json=body)
+    assert response.status_code in (400, 404, 500)
+    assert "error" in response.get_json()
+
+
+def test_stored_pdf_over_page_limit_answers_413(pdf_app):
+    import fitz
+    from app import get_storage
+
+    doc = fitz.open()
+    for _ in range(5):
+        doc.new_page()
+    with pdf_app.app_context():
+        doc.save(get_storage().path('uploads', 'big.pdf'))
+
+    response = pdf_app.test_client().post('/split/execute', json={"filename": "big.pdf", "mode": "all"})
+    assert response.status_code == 413
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+
+import fitz
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import load_manifest, load_journal, run_job
+
+
+def write_pdf(path, text="secret"):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text, fontsize=12)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([
+        {"id": "a", "operation": "merge", "inputs": ["1.pdf", "2.pdf"], "output": "out.pdf"},
+        {"id": "a", "operation": "merge", "inputs": ["3.pdf", "4.pdf"], "output": "out2.pdf"},
+    ]))
+    with pytest.raises(ValueError, match="Duplicate id"):
+        load_manifest(str(manifest))
+
+
+def test_explicit_id_clashing_with_a_position_is_rejected(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "id,operation,inputs,output,options\n"
+        ",merge,1.pdf;2.pdf,out.pdf,\n"
+        "1,merge,3.pdf;4.pdf,out2.pdf,\n"
+    )
+    with pytest.raises(ValueError, match="Duplicate id"):
+        load_manifest(str(manifest))
+
+
+def test_merge_creates_the_output_folder(tmp_path):
+    inputs = [write_pdf(tmp_path / "a.pdf"), write_pdf(tmp_path / "b.pdf")]
+    output = str(tmp_path / "out" / "nested" / "merged.pdf")
+    result = run_job({"id": "1", "operation": "merge", "inputs": inputs, "output": output})
+    assert result["status"] == "ok"
+    assert len(fitz.open(output)) == 2
+
+
+@pytest.mark.parametrize("terms", [["nowhere"], [""]])
+def test_redact_without_matches_is_ok(tmp_path, terms):
+    output = str(tmp_path / "out" / "a.pdf")
+    job = {
+        "id": "1",
+        "operation": "redact",
+        "inputs": [write_pdf(tmp_path / "a.pdf")],
+        "output": output,
+        "options": {"search_terms": terms},
+    }
+    result = run_job(job)
+    assert result["status"] == "ok"
+    assert "secret" in fitz.open(output)[0].get_text()
+
+    journal = tmp_path / "journal.jsonl"
+    journal.write_text(json.dumps(result) + "\n")
+    assert load_journal(str(journal)) == {"1"}
+
+
+def test_redact_without_zones_or_terms_is_an_error(tmp_path):
+    job = {"id": "1", "operation": "redact", "inputs": [write_pdf(tmp_path / "a.pdf")],
+           "output": str(tmp_path / "out.pdf")}
+    result = run_job(job)
+    assert result["status"] == "error"
+    assert "No redaction zones" in result["error"]
@@ -0,0 +1,161 @@
+import io
+import os
+import sys
+import json
+
+import fitz
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline
+from pipeline import Pipeline, PipelineError, PipelineTooLarge
+from censor_tools import LeakedTextError, search_text_in_document
+
+
+def make_pdf(pages, text="secret"):
+    doc = fitz.open()
+    for page_num in range(pages):
+        doc.new_page().insert_text((72, 72), f"{text} page {page_num + 1}", fontsize=12)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def files():
+    return {"a.pdf": make_pdf(2), "b.pdf": make_pdf(3)}
+
+
+def run(spec, files, **kwargs):
+    p = Pipeline(spec, files, **kwargs)
+    try:
+        return [len(doc) for doc in p.run()]
+    finally:
+        p.close()
+
+
+def test_merge_then_split(files):
+    spec = {
+        "steps": [
+            {"id": "merged", "op": "merge", "inputs": ["a.pdf", "b.pdf"]},
+            {"id": "parts", "op": "split", "inputs": ["merged"], "mode": "interval", "interval": 2},
+        ],
+        "output": "parts",
+    }
+    assert run(spec, files) == [2, 2, 1]
+
+
+def test_shared_step_runs_once(files, monkeypatch):
+    calls = []
+    run_merge = Pipeline.run_merge
+    monkeypatch.setattr(Pipeline, 'run_merge', lambda self, step: calls.append(step['id']) or run_merge(self, step))
+    spec = {
+        "steps": [
+            {"id": "base", "op": "merge", "inputs": ["a.pdf", "b.pdf"]},
+            {"id": "first", "op": "split", "inputs": ["base"], "mode": "custom", "pages": "1"},
+            {"id": "rest", "op": "split", "inputs": ["base"], "mode": "custom", "pages": "2-5"},
+            {"id": "all", "op": "merge", "inputs": ["first", "rest"]},
+        ],
+        "output": "all",
+    }
+    assert run(spec, files) == [5]
+    assert calls.count("base") == 1
+
+
+def test_cycle_is_rejected(files):
+    spec = {
+        "steps": [
+            {"id": "x", "op": "merge", "inputs": ["a.pdf", "y"]},
+            {"id": "y", "op": "merge", "inputs": ["x"]},
+        ],
+        "output": "x",
+    }
+    with pytest.raises(PipelineError, match="cycle"):
+        run(spec, files)
+
+
+def test_unknown_input_is_rejected(files):
+    spec = {"steps": [{"id": "m", "op": "merge", "inputs": ["a.pdf", "missing.pdf"]}], "output": "m"}
+    with pytest.raises(PipelineError, match="Unknown input"):
+        run(spec, files)
+
+
+def test_page_limit(files):
+    spec = {"steps": [{"id": "m", "op": "merge", "inputs": ["a.pdf", "b.pdf"]}], "output": "m"}
+    with pytest.raises(PipelineTooLarge):
+        run(spec, files, max_pages=4)
+
+
+@pytest.mark.parametrize("spec", [
+    {"steps": "merge", "output": "s"},
+    {"steps": [["s"]], "output": "s"},
+    {"steps": [{"id": 1, "op": "split", "inputs": ["a.pdf"]}], "output": 1},
+    {"steps": [{"id": "s", "op": "split", "inputs": ["a.pdf"]}], "output": ["s"]},
+    {"steps": [{"id": "s", "op": "rotate", "inputs": ["a.pdf"]}], "output": "s"},
+    {"steps": [{"id": "s", "op": "split", "inputs": "a.pdf"}], "output": "s"},
+    {"steps": [{"id": "s", "op": "split", "inputs": ["a.pdf"], "mode": "interval", "interval": "2"}], "output": "s"},
+    {"steps": [{"id": "s", "op": "split", "inputs": ["a.pdf"], "mode": "custom", "pages": "a-b"}], "output": "s"},
+    {"steps": [{"id": "s", "op": "redact", "inputs": ["a.pdf"], "redaction_zones": ["zone"]}], "output": "s"},
+    {"steps": [{"id": "s", "op": "redact", "inputs": ["a.pdf"], "redaction_zones": [{"page": "1"}]}], "output": "s"},
+    {"steps": [{"id": "s", "op": "redact", "inputs": ["a.pdf"], "search_terms": "secret"}], "output": "s"},
+    {"steps": [{"id": "s", "op": "redact", "inputs": ["a.pdf"], "search_terms": [""]}], "output": "s"},
+    {"steps": [{"id": "s", "op": "redact", "inputs": ["a.pdf"], "redaction_color": "red"}], "output": "s"},
+])
+def test_invalid_specs_are_rejected(spec, files):
+    with pytest.raises(PipelineError):
+        run(spec, files)
+
+
+def test_redact_removes_search_terms(files):
+    spec = {"steps": [{"id": "r", "op": "redact", "inputs": ["a.pdf"], "search_terms": ["secret"]}], "output": "r"}
+    p = Pipeline(spec, files)
+    try:
+        doc = p.run()[0]
+        assert "secret" not in doc[0].get_text()
+    finally:
+        p.close()
+
+
+def test_leaked_text_is_a_server_error(files, monkeypatch):
+    monkeypatch.setattr(pipeline, 'find_leaked_text_in_document', lambda doc, index: [{"page": 1, "text": "secret"}])
+    spec = {"steps": [{"id": "r", "op": "redact", "inputs": ["a.pdf"], "search_terms": ["secret"]}], "output": "r"}
+    with pytest.raises(LeakedTextError):
+        run(spec, files)
+
+
+def test_empty_search_term_finds_nothing(files):
+    doc = fitz.open("pdf", files["a.pdf"])
+    try:
+        assert search_text_in_document(doc, "") == []
+    finally:
+        doc.close()
+
+
+@pytest.fixture
+def client():
+    from app import create_app
+    return create_app().test_client()
+
+
+def post_pipeline(client, spec):
+    return client.post('/pipeline', data={
+        'pipeline': json.dumps(spec),
+        'files': [(io.BytesIO(make_pdf(2)), 'a.pdf')],
+    }, content_type='multipart/form-data')
+
+
+@pytest.mark.parametrize("extra", [{"save_profile": []}, {"save_profile": "tiny"}, {"filename": 5}])
+def test_route_rejects_invalid_options(client, extra):
+    spec = dict({"steps": [{"id": "s", "op": "split", "inputs": ["a.pdf"]}], "output": "s"}, **extra)
+    response = post_pipeline(client, spec)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_route_reports_leaks_as_server_error(client, monkeypatch):
+    monkeypatch.setattr(pipeline, 'find_leaked_text_in_document', lambda doc, index: [{"page": 1, "text": "secret"}])
+    spec = {"steps": [{"id": "r", "op": "redact", "inputs": ["a.pdf"], "search_terms": ["secret"]}], "output": "r"}
+    response = post_pipeline(client, spec)
+    assert response.status_code == 500
+    assert response.get_json()["leaked"] == [{"page": 1, "text": "secret"}]
@@ -0,0 +1,142 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+botocore_exceptions = pytest.importorskip("botocore.exceptions")
+ClientError = botocore_exceptions.ClientError
+
+from storage import S3Storage
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "operation")
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls S3Storage makes."""
+
+    def __init__(self):
+        self.objects = {}  # key -> (bytes, etag)
+        self.versions = 0
+        self.downloads = 0
+        self.fail_next_puts = 0
+
+    def _store(self, key, data):
+        self.versions += 1
+        self.objects[key] = (data, f'"etag-{self.versions}"')
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise client_error('404')
+        data, etag = self.objects[Key]
+        return {"ETag": etag, "ContentLength": len(data)}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise client_error('NoSuchKey')
+        data, etag = self.objects[Key]
+        return {"Body": io.BytesIO(data), "ETag": etag}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None):
+        if self.fail_next_puts:
+            # Another node wrote the counter between our read and our write
+            self.fail_next_puts -= 1
+            current = int(self.objects[Key][0]) if Key in self.objects else 0
+            self._store(Key, str(current + 1).encode())
+            raise client_error('PreconditionFailed')
+        if IfNoneMatch == '*' and Key in self.objects:
+            raise client_error('PreconditionFailed')
+        if IfMatch is not None and (Key not in self.objects or self.objects[Key][1] != IfMatch):
+            raise client_error('PreconditionFailed')
+        self._store(Key, Body)
+
+    def upload_file(self, Filename, Bucket, Key):
+        with open(Filename, 'rb') as f:
+            self._store(Key, f.read())
+
+    def download_file(self, Bucket, Key, Filename):
+        self.downloads += 1
+        with open(Filename, 'wb') as f:
+            f.write(self.objects[Key][0])
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    config = {'S3_BUCKET': 'bucket', 'S3_PREFIX': 'test/', 'STORAGE_SCRATCH_FOLDER': str(tmp_path)}
+    return S3Storage(config, client=FakeS3Client())
+
+
+def test_counter_starts_at_zero(storage):
+    assert storage.read_counter() == 0
+    assert storage.increment_counter() == 1
+    assert storage.increment_counter() == 2
+
+
+def test_increment_counter_retries_when_another_node_wins(storage):
+    storage.increment_counter()
+    storage.client.fail_next_puts = 2  # Two other nodes increment first
+
+    assert storage.increment_counter() == 4
+    assert storage.read_counter() == 4
+
+
+def test_fetch_missing_object_returns_none(storage):
+    assert storage.fetch('uploads', 'missing.pdf') is None
+
+
+def test_fetch_reuses_scratch_copy_until_object_changes(storage):
+    with open(storage.path('uploads', 'a.pdf'), 'wb') as f:
+        f.write(b'first')
+    storage.commit('uploads', 'a.pdf')
+
+    assert storage.fetch('uploads', 'a.pdf') == storage.path('uploads', 'a.pdf')
+    assert storage.fetch('uploads', 'a.pdf') == storage.path('uploads', 'a.pdf')
+    assert storage.client.downloads == 0
+
+    # Another node replaces the object
+    storage.client._store('test/uploads/a.pdf', b'second version')
+    with open(storage.fetch('uploads', 'a.pdf'), 'rb') as f:
+        assert f.read() == b'second version'
+    assert storage.client.downloads == 1
+
+
+def test_release_and_delete_remove_scratch_copy(storage):
+    with open(storage.path('split', 'p.pdf'), 'wb') as f:
+        f.write(b'pdf')
+    storage.commit('split', 'p.pdf')
+
+    storage.release('split', 'p.pdf')
+    assert not os.path.exists(storage.path('split', 'p.pdf'))
+    assert storage.fetch('split', 'p.pdf') is not None
+
+    storage.delete('split', 'p.pdf')
+    assert not os.path.exists(storage.path('split', 'p.pdf'))
+    assert storage.fetch('split', 'p.pdf') is None
+
+
+def test_size_reads_object_metadata_only(storage):
+    storage.client._store('test/uploads/a.pdf', b'12345')
+    assert storage.size('uploads', 'a.pdf') == 5
+    assert storage.size('uploads', 'missing.pdf') is None
+    assert storage.client.downloads == 0
+
+
+def test_stored_pdf_cost_does_not_download_before_admission(storage):
+    from app import create_app, stored_pdf_cost
+
+    app = create_app()
+    app.extensions['storage'] = storage
+    storage.client._store('test/uploads/a.pdf', b'x' * 2048)
+
+    with app.test_request_context('/censor/execute', method='POST', json={"filename": "a.pdf"}):
+        assert stored_pdf_cost() == {"size_bytes": 2048}
+    with app.test_request_context('/censor/execute', method='POST', json=[1]):
+        assert stored_pdf_cost() == {}
+    assert storage.client.downloads == 0
@@ -0,0 +1,4 @@
+"""WSGI entry point: builds the single application instance served by gunicorn or another WSGI server."""
+from app import create_app
+
+app = create_app()